@@ -0,0 +1,238 @@
+import copy
+import random
+import threading
+import logging
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # optional; the planner falls back to the random module
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+class _Stream:
+    # A run of pre-drawn values held in a compact array, consumed front to back
+    def __init__(self, typecode, generate):
+        self.typecode = typecode
+        self.generate = generate  # generate(n) -> array of n new values
+        self.values = array(typecode)
+        self.index = 0
+
+    def remaining(self):
+        return len(self.values) - self.index
+
+    def ensure(self, count):
+        missing = count - self.remaining()
+        if missing > 0:
+            # Drop what has been consumed before appending the next batch
+            self.values = self.values[self.index:]
+            self.index = 0
+            self.values.extend(self.generate(missing))
+
+    def take(self, count=1):
+        self.ensure(count)
+        start = self.index
+        self.index += count
+        return self.values[start:self.index]
+
+    def copy_from(self, other):
+        # Continue from where other stands: its drawn but unused values first, then our own generate
+        self.values = other.values[other.index:]
+        self.index = 0
+
+
+class ActivityPlanner:
+    # Pre-draws the anonymizer's random decisions (min durations, continue rolls, context coin
+    # flips, search delays and search words) `horizon_hours` at a time, vectorised with NumPy when
+    # it is installed, so the playback and search loops only read the next value. The anonymizer's
+    # ranges are read when a batch is generated; config changes apply from the next batch.
+    def __init__(self, anonymizer, horizon_hours=1.0, seed=None, mean_track_seconds=210):
+        self.anonymizer = anonymizer
+        self.horizon_hours = horizon_hours
+        self.mean_track_seconds = mean_track_seconds
+        self.uses_numpy = np is not None
+        self._np_rng = np.random.default_rng(seed) if np is not None else None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._make_streams()
+
+    def _make_streams(self):
+        self._min_durations = _Stream('d', lambda n: self._uniform(*self.anonymizer.min_song_duration_range, n))
+        self._continue_rolls = _Stream('d', lambda n: self._uniform(0.0, 1.0, n))
+        self._context_rolls = _Stream('d', lambda n: self._uniform(0.0, 1.0, n))
+        self._search_delays = _Stream('d', lambda n: self._uniform(*self.anonymizer.search_delay_range, n))
+        self._word_counts = _Stream('B', lambda n: self._integers(1, 4, n))
+        self._word_indices = _Stream('I', lambda n: self._integers(0, max(1, len(self.anonymizer.search_words)), n))
+
+    def _uniform(self, low, high, count):
+        if self._np_rng is not None:
+            return array('d', self._np_rng.uniform(low, high, count).tobytes())
+        uniform = self._rng.uniform
+        return array('d', [uniform(low, high) for _ in range(count)])
+
+    def _integers(self, low, high, count):
+        # high is exclusive
+        if self._np_rng is not None:
+            return self._np_rng.integers(low, high, count).tolist()
+        randrange = self._rng.randrange
+        return [randrange(low, high) for _ in range(count)]
+
+    def _batch_sizes(self):
+        anonymizer = self.anonymizer
+        seconds = self.horizon_hours * 3600
+        songs = int(seconds / max(1.0, anonymizer.min_song_duration_range[0])) + 1
+        searches = int(min(
+            seconds / max(0.1, anonymizer.search_delay_range[0]),
+            self.horizon_hours * 60 * anonymizer.max_searches_per_minute,
+        )) + 1
+        return songs, searches
+
+    def _take(self, stream, songs_or_searches):
+        with self._lock:
+            if stream.remaining() < 1:
+                songs, searches = self._batch_sizes()
+                stream.ensure(songs if songs_or_searches == "songs" else searches)
+                logger.debug("Planner generated %d values", stream.remaining())
+            return stream.take()[0]
+
+    def min_duration(self):
+        return self._take(self._min_durations, "songs")
+
+    def continue_roll(self):
+        return self._take(self._continue_rolls, "songs")
+
+    def context_roll(self):
+        return self._take(self._context_rolls, "songs")
+
+    def search_delay(self):
+        return self._take(self._search_delays, "searches")
+
+    def search_query(self):
+        words = self.anonymizer.search_words
+        if not words:
+            return ""
+        with self._lock:
+            if self._word_counts.remaining() < 1:
+                _, searches = self._batch_sizes()
+                self._word_counts.ensure(searches)
+                self._word_indices.ensure(3 * searches)
+            count = self._word_counts.take()[0]
+            indices = self._word_indices.take(count)
+        picked = []
+        for index in indices:
+            word = words[index % len(words)]
+            if word not in picked:
+                picked.append(word)
+        return ' '.join(picked)
+
+    def _clone(self):
+        # Same plan and random state, so the clone draws exactly the decisions this planner will make
+        with self._lock:
+            clone = copy.copy(self)
+            clone._lock = threading.Lock()
+            clone._rng = random.Random()
+            clone._rng.setstate(self._rng.getstate())
+            clone._np_rng = copy.deepcopy(self._np_rng)
+            clone._make_streams()
+            for name in ('_min_durations', '_continue_rolls', '_context_rolls', '_search_delays',
+                         '_word_counts', '_word_indices'):
+                getattr(clone, name).copy_from(getattr(self, name))
+        return clone
+
+    def forecast(self, hours=6.0, searches_per_song=None, catalogue=None):
+        # Expected load from the upcoming planned decisions. Runs on a clone so the live plan is
+        # neither consumed nor extended. Full-play lengths are unknown ahead of time, so
+        # mean_track_seconds stands in for them. With a playlist catalogue, context streams cost
+        # its refreshes instead of a featured-playlists lookup each.
+        anonymizer = self.anonymizer
+        seconds = hours * 3600
+        songs = int(seconds / max(1.0, anonymizer.min_song_duration_range[0])) + 1
+        _, searches_per_hour = self._batch_sizes()
+        searches = int(searches_per_hour / self.horizon_hours * hours) + 1
+        plan = self._clone()
+        min_durations = plan._min_durations.take(songs)
+        continue_rolls = plan._continue_rolls.take(songs)
+        context_rolls = plan._context_rolls.take(songs)
+        search_delays = plan._search_delays.take(searches)
+
+        if searches_per_song is None:
+            searches_per_song = 1 / 3 if anonymizer.use_track_pool else 1.0
+        full_length = self.mean_track_seconds + anonymizer.safety_buffer
+        buckets = int(hours + 0.999999)
+        chance = anonymizer.full_song_chance
+        context_chance = anonymizer.context_stream_chance
+
+        if np is not None:
+            rolls = np.frombuffer(continue_rolls, dtype=np.float64)
+            contexts = np.frombuffer(context_rolls, dtype=np.float64) < context_chance
+            full = rolls < chance
+            lengths = np.where(full, np.where(contexts, anonymizer.default_context_duration, full_length),
+                               np.frombuffer(min_durations, dtype=np.float64))
+            starts = np.concatenate(([0.0], np.cumsum(lengths)[:-1]))
+            in_window = starts < seconds
+            hour = (starts[in_window] // 3600).astype(int)
+            song_counts = np.bincount(hour, minlength=buckets)[:buckets]
+            full_counts = np.bincount(hour, weights=full[in_window], minlength=buckets)[:buckets]
+            context_counts = np.bincount(hour, weights=contexts[in_window], minlength=buckets)[:buckets]
+            search_times = np.cumsum(np.frombuffer(search_delays, dtype=np.float64))
+            search_counts = np.bincount((search_times[search_times < seconds] // 3600).astype(int),
+                                        minlength=buckets)[:buckets]
+            song_counts, full_counts, context_counts, search_counts = (
+                c.tolist() for c in (song_counts, full_counts, context_counts, search_counts))
+        else:
+            song_counts, full_counts, context_counts, search_counts = ([0] * buckets for _ in range(4))
+            start = 0.0
+            for min_duration, roll, context_roll in zip(min_durations, continue_rolls, context_rolls):
+                if start >= seconds:
+                    break
+                hour = int(start // 3600)
+                is_context = context_roll < context_chance
+                song_counts[hour] += 1
+                context_counts[hour] += is_context
+                if roll < chance:
+                    full_counts[hour] += 1
+                    start += anonymizer.default_context_duration if is_context else full_length
+                else:
+                    start += min_duration
+            start = 0.0
+            for delay in search_delays:
+                start += delay
+                if start >= seconds:
+                    break
+                search_counts[int(start // 3600)] += 1
+
+        hourly_cap = 60 * anonymizer.max_searches_per_minute
+        schedule = []
+        for hour in range(buckets):
+            background = min(search_counts[hour], hourly_cap)
+            track_songs = song_counts[hour] - context_counts[hour]
+            if catalogue is not None:
+                # Refresh requests per hour; the last bucket may only cover part of an hour
+                hour_fraction = min(1.0, hours - hour)
+                lookups = catalogue.requests_per_refresh() * 3600 / max(1.0, catalogue.ttl) * hour_fraction
+            else:
+                lookups = context_counts[hour]  # inline featured-playlists lookup per context
+            schedule.append({
+                'hour': hour,
+                'songs': int(song_counts[hour]),
+                'full_plays': int(full_counts[hour]),
+                'context_streams': int(context_counts[hour]),
+                'searches': int(background),
+                'playlist_lookups': int(round(lookups)),
+                # play per song, playlist lookups, searches feeding new tracks, background searches
+                'api_calls': int(round(song_counts[hour] + lookups
+                                       + track_songs * searches_per_song + background)),
+            })
+        return {
+            'hours': hours,
+            'numpy': self.uses_numpy,
+            'mean_track_seconds': self.mean_track_seconds,
+            'playlist_catalogue': catalogue is not None,
+            'schedule': schedule,
+            'totals': {
+                key: sum(entry[key] for entry in schedule)
+                for key in ('songs', 'full_plays', 'context_streams', 'searches', 'playlist_lookups', 'api_calls')
+            },
+        }
@@ -1,33 +1,67 @@
 import random
 import time
 import os
+import threading
 import json
 import requests
 from pathlib import Path
 import logging
 
+from wordlist import load_word_list
+from metrics import SONG_SWITCH_SECONDS
+
 logger = logging.getLogger(__name__)
 
 class Anonymizer:
-    def __init__(self):
-        self.search_words = self.load_word_list()
+    def __init__(self, clock=None, rng=None, search_words=None):
+        # clock and rng are injectable so the policy can be replayed on a virtual clock (see simulator.py)
+        self.clock = clock or time.time
+        self.rng = rng or random
+        self.search_words = self.load_word_list() if search_words is None else search_words
         self.max_searches_per_minute = 50
-        self.next_search_time = time.time() + random.uniform(0.5, 1.5)
+        self.search_delay_range = (1.0, 5.0)  # random delay between searches, seconds
+        self.next_search_time = self.clock() + self.rng.uniform(0.5, 1.5)
         self.last_search_time = 0
         self.search_count = 0
-        self.search_count_reset_time = time.time()
+        self.search_count_reset_time = self.clock()
+        self.search_lock = threading.Lock()  # searches are paced from the engine's dispatcher, off the playback path
         self.current_song = None
         self.song_start_time = 0
         self.min_song_duration_range = (10, 15)  # random range min, max
         self.full_song_chance = 0.20  # 1.0 = guaranteed, 0.1 = 10% chance
         self.song_duration_ms = 0
         self.safety_buffer = 5
+        self.default_context_duration = 180  # seconds to play a stream with unknown duration
+        self.use_track_pool = True  # prefetch playable tracks in the background
+        self.track_pool_low_water = 5
+        self.track_pool_high_water = 20
+        self.track_pool_max_age = 1800  # seconds before a prefetched track is discarded
+        self.track_pool = None
+        self.playback_state_mode = os.environ.get("SPOTIFUCK_PLAYBACK_STATE", "0") == "1"  # time switches from /me/player/currently-playing progress
+        self.state_poll_interval_range = (2, 30)  # min, max seconds between playback state polls
+        self.state_end_buffer = 1  # replaces safety_buffer once progress has been synced
+        self.next_state_poll = 0
+        self.state_synced = False
+        self.gapless_mode = os.environ.get("SPOTIFUCK_GAPLESS", "0") == "1"  # queue the next track instead of a hard play
+        self.queue_lead = 15  # seconds before the predicted end at which the next track is queued
+        self.queued_song = None
+        self.queue_retry_delay = 5  # seconds to wait after a queue attempt found no track
+        self.queue_retry_time = 0
+        self.batch_size = int(os.environ.get("SPOTIFUCK_BATCH_SIZE", "1"))  # tracks per play call, 1 disables batching
+        self.batch_tracks_per_search = 3
+        self.batch = []
+        self.batch_index = 0
+        self.context_stream_chance = 0.2  # chance of starting a featured playlist instead of a track
+        self.use_playlist_catalogue = True  # sample context streams from a cached playlist catalogue, see playlist_catalogue.py
+        self.use_planner = os.environ.get("SPOTIFUCK_PLANNER", "0") == "1"  # pre-generate decisions, see activity_planner.py
+        self.planner = None
 
         logger.info("Anonymizer initialized with %d search terms", len(self.search_words))
         logger.info("Min song duration range: %d-%d s, Continue chance: %.1f%%",
                     self.min_song_duration_range[0], self.min_song_duration_range[1], 
                     self.full_song_chance * 100)
-        logger.info("Search settings: Random Delay (1-5s), Max/Min: %d",
+        logger.info("Search settings: Random Delay (%.1f-%.1fs), Max/Min: %d",
+                    self.search_delay_range[0], self.search_delay_range[1],
                     self.max_searches_per_minute)
 
     def load_word_list(self):
@@ -47,29 +81,29 @@ class Anonymizer:
                 with open(wordlist_path, 'w') as f:
                     f.write('\n'.join(default_words))
                 logger.info("Created default wordlist with %d terms", len(default_words))
-                return default_words
             except IOError as e:
                 logger.error(f"Failed to create default wordlist: {e}")
-                return []
+                return default_words
         try:
-            with open(wordlist_path, 'r') as f:
-                words = [line.strip() for line in f if line.strip()]
-                logger.info("Loaded %d search terms from wordlist", len(words))
-                return words
-        except IOError as e:
+            words = load_word_list(wordlist_path)
+            logger.info("Loaded %d search terms from wordlist", len(words))
+            return words
+        except (IOError, ValueError) as e:
             logger.error(f"Failed to load wordlist from {wordlist_path}: {e}")
             return []
 
     def get_random_context_type(self):
-        return random.choice(['playlist', 'album', 'artist'])
+        return self.rng.choice(['playlist', 'album', 'artist'])
 
     def get_random_search(self):
         if not self.search_words:
             logger.warning("Search word list is empty.")
             return ""
-        num_words = random.randint(1, 3)
+        if self.planner:
+            return self.planner.search_query()
+        num_words = self.rng.randint(1, 3)
         k = min(num_words, len(self.search_words))
-        search_words = random.sample(self.search_words, k)
+        search_words = self.rng.sample(self.search_words, k)
         return ' '.join(search_words)
 
     def start_immediate_playback(self, spotify_client, stats):
@@ -89,7 +123,7 @@ class Anonymizer:
             return False
 
     def can_perform_search(self):
-        current_time = time.time()
+        current_time = self.clock()
         if current_time - self.search_count_reset_time >= 60:
             self.search_count = 0
             self.search_count_reset_time = current_time
@@ -98,11 +132,28 @@ class Anonymizer:
             return True
         return False
 
+    def reserve_search(self):
+        # Claims the slot before the request is made so concurrent searches can't overshoot the pacing
+        with self.search_lock:
+            if not self.can_perform_search():
+                return False
+            self.update_search_metrics()
+            return True
+
+    def next_search_deadline(self):
+        with self.search_lock:
+            if self.search_count >= self.max_searches_per_minute:
+                return max(self.next_search_time, self.search_count_reset_time + 60)
+            return self.next_search_time
+
     def update_search_metrics(self):
-        current_time = time.time()
+        current_time = self.clock()
         self.last_search_time = current_time
         self.search_count += 1
-        delay = random.uniform(1.0, 5.0)
+        if self.planner:
+            delay = self.planner.search_delay()
+        else:
+            delay = self.rng.uniform(self.search_delay_range[0], self.search_delay_range[1])
         self.next_search_time = current_time + delay
         logger.debug("Search metrics updated. Count: %d/%d. Next search possible in %.2f s",
                      self.search_count, self.max_searches_per_minute, delay)
@@ -112,66 +163,207 @@ class Anonymizer:
             logger.debug("No current song/context, reason: START_NEW")
             return "START_NEW"
 
-        current_time = time.time()
+        current_time = self.clock()
         time_played = current_time - self.song_start_time
         current_item_name = self.current_song.get('name', self.current_song.get('uri', 'Unknown Item'))
 
-        if 'min_duration' not in self.current_song:
-            min_duration = random.uniform(self.min_song_duration_range[0], self.min_song_duration_range[1])
-            self.current_song['min_duration'] = min_duration
-            logger.debug(f"Set random minimum duration for {current_item_name}: {min_duration:.1f}s")
-        else:
-            min_duration = self.current_song['min_duration']
-
+        min_duration = self._get_min_duration()
         if time_played < min_duration:
             return False
 
-        if 'continue_roll' not in self.current_song:
-            roll = random.random()
-            self.current_song['continue_roll'] = roll
-            logger.debug(f"Generated continue roll for {current_item_name}: {roll:.2f}")
-        else:
-            roll = self.current_song['continue_roll']
+        roll = self._get_continue_roll()
 
         if roll < self.full_song_chance:
+            if self.current_song.get('ended'):
+                logger.info("Playback moved on from %s. Reason: COMPLETED", current_item_name)
+                return "COMPLETED"
             if self.song_duration_ms > 0:
-                song_duration_seconds = (self.song_duration_ms / 1000) + self.safety_buffer
+                song_duration_seconds = (self.song_duration_ms / 1000) + self._end_buffer()
                 if time_played >= song_duration_seconds:
                     logger.info(
-                        f"Song completed duration for {current_item_name} "
-                        f"({time_played:.1f}s >= {song_duration_seconds:.1f}s). Reason: COMPLETED"
+                        "Song completed duration for %s (%.1fs >= %.1fs). Reason: COMPLETED",
+                        current_item_name, time_played, song_duration_seconds,
                     )
                     return "COMPLETED"
                 else:
                     return False
             else:
-                default_duration = 180
+                default_duration = self.default_context_duration
                 if time_played >= default_duration:
                     logger.info(
-                        f"Reached default duration for {current_item_name} without duration info "
-                        f"({time_played:.1f}s >= {default_duration}s). Reason: COMPLETED_DEFAULT"
+                        "Reached default duration for %s without duration info (%.1fs >= %ss). "
+                        "Reason: COMPLETED_DEFAULT",
+                        current_item_name, time_played, default_duration,
                     )
                     return "COMPLETED"
                 
                 logger.debug(
-                    f"Continue playing {current_item_name} (roll={roll:.2f} < {self.full_song_chance:.2f}, "
-                    f"time_played={time_played:.1f}s)"
+                    "Continue playing %s (roll=%.2f < %.2f, time_played=%.1fs)",
+                    current_item_name, roll, self.full_song_chance, time_played,
                 )
                 return False
         else:
             reason = "CONTEXT_CHANGE" if self.song_duration_ms <= 0 else "SKIP_EARLY"
             logger.info(
-                f"Min duration met ({time_played:.1f}s >= {min_duration:.1f}s) and continue chance failed "
-                f"(Roll {roll:.2f} >= {self.full_song_chance:.2f}). "
-                f"Reason: {reason} for: {current_item_name}"
+                "Min duration met (%.1fs >= %.1fs) and continue chance failed (Roll %.2f >= %.2f). "
+                "Reason: %s for: %s",
+                time_played, min_duration, roll, self.full_song_chance, reason, current_item_name,
             )
             return reason
 
+    def _get_min_duration(self):
+        if 'min_duration' not in self.current_song:
+            if self.planner:
+                min_duration = self.planner.min_duration()
+            else:
+                min_duration = self.rng.uniform(self.min_song_duration_range[0], self.min_song_duration_range[1])
+            self.current_song['min_duration'] = min_duration
+            current_item_name = self.current_song.get('name', self.current_song.get('uri', 'Unknown Item'))
+            logger.debug("Set random minimum duration for %s: %.1fs", current_item_name, min_duration)
+        return self.current_song['min_duration']
+
+    def _get_continue_roll(self):
+        if 'continue_roll' not in self.current_song:
+            roll = self.planner.continue_roll() if self.planner else self.rng.random()
+            self.current_song['continue_roll'] = roll
+            current_item_name = self.current_song.get('name', self.current_song.get('uri', 'Unknown Item'))
+            logger.debug("Generated continue roll for %s: %.2f", current_item_name, roll)
+        return self.current_song['continue_roll']
+
+    def next_change_time(self):
+        # Earliest time at which should_change_song() can return a reason
+        current_time = self.clock()
+        if not self.current_song:
+            return current_time
+
+        min_deadline = self.song_start_time + self._get_min_duration()
+        if current_time < min_deadline:
+            return min_deadline
+
+        if self._get_continue_roll() < self.full_song_chance:
+            if self.current_song.get('ended'):
+                return current_time
+            if self.song_duration_ms > 0:
+                deadline = self.song_start_time + (self.song_duration_ms / 1000) + self._end_buffer()
+            else:
+                deadline = self.song_start_time + self.default_context_duration
+            if self._queue_pending():
+                deadline = min(deadline, max(self._queue_deadline(), self.queue_retry_time))
+            if self.playback_state_mode:
+                return max(current_time, min(deadline, self.next_state_poll))
+            return max(current_time, deadline)
+        return current_time
+
+    def _queue_deadline(self):
+        return self.song_start_time + self.song_duration_ms / 1000 - self.queue_lead
+
+    def _queue_pending(self):
+        # A full play of a track still needs its successor queued; inside a batch the next URI is already lined up
+        return (
+            self.gapless_mode
+            and self.current_song is not None
+            and self.queued_song is None
+            and not self.has_batch_next()
+            and self.song_duration_ms > 0
+        )
+
+    def queue_due(self):
+        return (
+            self._queue_pending()
+            and not self.current_song.get('ended')
+            and self.clock() >= self.song_start_time + self._get_min_duration()
+            and self._get_continue_roll() < self.full_song_chance
+            and self.clock() >= self._queue_deadline()
+            and self.clock() >= self.queue_retry_time
+        )
+
+    def _enqueue_next(self, spotify_client):
+        song = self._next_song(spotify_client)
+        if not song:
+            # Empty or failed search (or an open circuit): back off instead of searching on every wake-up
+            self.queue_retry_time = self.clock() + self.queue_retry_delay
+            logger.info("No track to queue, retrying in %.0f s", self.queue_retry_delay)
+            return False
+        if not spotify_client.add_to_queue(song['uri']):
+            logger.warning("Failed to queue %s; the next switch will be a hard play.", song.get('name'))
+            # Keep the track so the fallback play doesn't need another search
+            song['queue_failed'] = True
+        self.queued_song = song
+        return True
+
+    def _end_buffer(self):
+        return self.state_end_buffer if self.state_synced else self.safety_buffer
+
+    def _reset_playback_state(self):
+        self.next_state_poll = 0
+        self.state_synced = False
+
+    def playback_state_due(self):
+        # Progress only matters while a full play is in progress
+        return (
+            self.playback_state_mode
+            and self.current_song is not None
+            and self.clock() >= self.next_state_poll
+            and self.clock() >= self.song_start_time + self._get_min_duration()
+            and self._get_continue_roll() < self.full_song_chance
+        )
+
+    def sync_playback_state(self, state):
+        current_time = self.clock()
+        min_interval, max_interval = self.state_poll_interval_range
+        if state is None or not self.current_song:
+            self.next_state_poll = current_time + max_interval
+            return
+
+        item = state.get('item')
+        expected_uri = self.current_song.get('uri', '')
+        context = state.get('context') or {}
+        is_context = not expected_uri.startswith('spotify:track:')
+        if not item:
+            ended = True  # playback stopped or the device went away
+        elif is_context:
+            # None until known when start_stream did not report which context it started
+            expected_context = self.current_song.get('context_uri')
+            playing_uri = self.current_song.get('playing_uri')
+            ended = ((expected_context is not None and context.get('uri') not in (None, expected_context))
+                     or (playing_uri is not None and item.get('uri') != playing_uri))
+        else:
+            ended = item.get('uri') != expected_uri
+        if ended:
+            logger.debug("Playback state no longer matches %s", expected_uri)
+            self.current_song['ended'] = True
+            return
+
+        duration_ms = item.get('duration_ms') or 0
+        progress_ms = state.get('progress_ms') or 0
+        if duration_ms > 0:
+            if is_context:
+                self.current_song['playing_uri'] = item.get('uri')
+                if self.current_song.get('context_uri') is None:
+                    self.current_song['context_uri'] = context.get('uri')
+            self.song_duration_ms = duration_ms
+            self.song_start_time = current_time - progress_ms / 1000
+            self.state_synced = True
+
+        remaining = (duration_ms - progress_ms) / 1000 if duration_ms > 0 else max_interval
+        if not state.get('is_playing'):
+            # Paused or buffering: progress is frozen, so keep re-anchoring often
+            interval = min_interval
+        else:
+            interval = min(max_interval, max(min_interval, remaining / 2))
+        self.next_state_poll = current_time + interval
+        logger.debug("Playback state synced: %.1f s remaining, next poll in %.1f s", remaining, interval)
+
     def ensure_continuous_playback(self, spotify_client, stats):
+        if self.playback_state_due():
+            self.sync_playback_state(spotify_client.get_playback_state())
+
         change_reason = self.should_change_song()
+        if not change_reason and self.queue_due():
+            self._enqueue_next(spotify_client)
 
         if change_reason:
-            logger.debug(f"Change needed. Reason: {change_reason}")
+            logger.debug("Change needed. Reason: %s", change_reason)
 
             if self.current_song and change_reason == "COMPLETED":
                 song_name = self.current_song.get('name', 'Unknown Song')
@@ -182,21 +374,123 @@ class Anonymizer:
                     if isinstance(artist_info, dict):
                         artist_name = artist_info.get('name', 'Unknown Artist')
 
-                logger.info(f"Logging completed song: {song_name} by {artist_name}")
+                logger.info("Logging completed song: %s by %s", song_name, artist_name)
                 stats.add_log(
                     f"Completed full song: {song_name} by {artist_name}",
                     'play'
                 )
 
-            success = self._start_new_stream(spotify_client, stats)
+            switch_start = time.perf_counter()
+            queued = self.queued_song
+            if change_reason == "COMPLETED" and queued and not queued.get('queue_failed'):
+                success = self._advance_to_queued(stats)
+            elif self.has_batch_next():
+                success = self._advance_in_batch(spotify_client, stats, change_reason)
+            else:
+                success = self._start_new_stream(spotify_client, stats)
+            SONG_SWITCH_SECONDS.observe(time.perf_counter() - switch_start)
             if not success:
                 logger.warning("Failed to start a new stream. Will retry on next cycle.")
                 self.current_song = None
+                return False
+        return True
+
+    def _advance_to_queued(self, stats):
+        # The device moves on to the queued track by itself when the current one ends
+        song = self.queued_song
+        self.queued_song = None
+        self.batch = []
+        self._advance_to(song, self.song_start_time + self.song_duration_ms / 1000, stats)
+        return True
+
+    def has_batch_next(self):
+        return (
+            self.batch_index + 1 < len(self.batch)
+            and self.current_song is self.batch[self.batch_index]
+        )
+
+    def _advance_in_batch(self, spotify_client, stats, change_reason):
+        if change_reason == "COMPLETED":
+            # A full play runs into the next URI of the batch on its own
+            start_time = self.song_start_time + self.song_duration_ms / 1000
+        elif spotify_client.next_track():
+            start_time = self.clock()
+        else:
+            logger.warning("Skip within batch failed, starting a new batch.")
+            self.batch = []
+            return self._start_new_stream(spotify_client, stats)
+        self.batch_index += 1
+        self._advance_to(self.batch[self.batch_index], start_time, stats)
+        return True
+
+    def _advance_to(self, song, start_time, stats):
+        self.current_song = song
+        self.song_duration_ms = song.get('duration_ms', 0)
+        self.song_start_time = min(start_time, self.clock())
+        self._reset_playback_state()
+        song_name, artist_name = self._describe(song)
+        stats.add_log(f"Streaming song: {song_name} by {artist_name}", 'stream')
+        logger.info("Advanced to song: %s by %s", song_name, artist_name)
+
+    def _describe(self, song):
+        artist_name = 'Unknown Artist'
+        artists = song.get('artists')
+        if artists and isinstance(artists, list) and isinstance(artists[0], dict):
+            artist_name = artists[0].get('name', 'Unknown Artist')
+        return song.get('name', 'Unknown Song'), artist_name
+
+    def _next_song(self, spotify_client):
+        song = self.track_pool.take() if self.track_pool else None
+        if song:
+            logger.debug("Using prefetched track from pool (%d left)", len(self.track_pool))
+            return song
+        return self._search_for_song(spotify_client)
+
+    def _collect_batch(self, spotify_client, first=None):
+        songs = [first] if first else []
+        uris = {song['uri'] for song in songs}
+        attempts = 0
+        while len(songs) < self.batch_size and attempts < self.batch_size:
+            attempts += 1
+            song = self.track_pool.take() if self.track_pool else None
+            if song:
+                candidates = [song]
+            else:
+                query = self.get_random_search()
+                if not query:
+                    break
+                tracks = self.playable_tracks(spotify_client.search(query))
+                candidates = self.rng.sample(tracks, min(self.batch_tracks_per_search, len(tracks)))
+            for song in candidates:
+                if song['uri'] not in uris and len(songs) < self.batch_size:
+                    uris.add(song['uri'])
+                    songs.append(song)
+        self.rng.shuffle(songs)
+        return songs
+
+    def _start_batch(self, spotify_client, stats, first=None):
+        songs = self._collect_batch(spotify_client, first)
+        if not songs:
+            logger.warning("Could not collect any tracks for a batch.")
+            return False
+        logger.info("Attempting to play a batch of %d songs", len(songs))
+        if not spotify_client.play_song([song['uri'] for song in songs]):
+            logger.warning("Failed to play batch of %d songs", len(songs))
+            self.current_song = None
+            return False
+        self.batch = songs
+        self.batch_index = 0
+        self._advance_to(songs[0], self.clock(), stats)
+        return True
 
     def _start_new_stream(self, spotify_client, stats):
         self.song_duration_ms = 0
+        self.batch = []
+        # A track that was picked for the queue is played directly rather than discarded
+        queued, self.queued_song = self.queued_song, None
 
-        if random.random() < 0.2:
+        context_roll = self.planner.context_roll() if self.planner else self.rng.random()
+        if not queued and context_roll < self.context_stream_chance:
             logger.info("Attempting to start a featured playlist/context stream")
             context_uri_played = spotify_client.start_stream()
             if context_uri_played:
@@ -207,27 +501,20 @@ class Anonymizer:
                 self.current_song = {
                     'name': 'Playlist/Context Stream',
                     'uri': context_uri_played if isinstance(context_uri_played, str) else 'spotify:context:various',
+                    'context_uri': context_uri_played if isinstance(context_uri_played, str) else None,
                     'artists': [{'name': 'Various Artists'}]
                 }
-                self.song_start_time = time.time()
+                self.song_start_time = self.clock()
+                self._reset_playback_state()
                 return True
             else:
                 logger.warning("Failed to start featured playlist/context stream. Falling back to search.")
 
-        search_query = self.get_random_search()
-        if not search_query:
-            logger.warning("Could not generate search query. Skipping song search.")
-            return False
-
-        logger.info(f"Searching for songs with query: '{search_query}'")
-        search_result = spotify_client.search(search_query)
-        if not search_result:
-            logger.warning(f"Search for '{search_query}' returned no result object.")
-            return False
+        if self.batch_size > 1:
+            return self._start_batch(spotify_client, stats, queued)
 
-        song = self.get_random_song(search_result)
+        song = queued or self._next_song(spotify_client)
         if not song:
-            logger.warning(f"No suitable songs found in search results for '{search_query}'.")
             return False
 
         song_name = song.get('name', 'Unknown Song')
@@ -238,11 +525,11 @@ class Anonymizer:
             if isinstance(artist_info, dict):
                 artist_name = artist_info.get('name', 'Unknown Artist')
 
-        logger.info(f"Attempting to play song: {song_name} by {artist_name}")
+        logger.info("Attempting to play song: %s by %s", song_name, artist_name)
 
         self.song_duration_ms = song.get('duration_ms', 0)
         if self.song_duration_ms > 0:
-            logger.info(f"Song duration: {self.song_duration_ms/1000:.1f} seconds")
+            logger.info("Song duration: %.1f seconds", self.song_duration_ms / 1000)
         else:
             logger.warning(f"Song '{song_name}' has zero or missing duration_ms.")
 
@@ -253,24 +540,43 @@ class Anonymizer:
 
         if spotify_client.play_song(song_uri):
             self.current_song = song
-            self.song_start_time = time.time()
+            self.song_start_time = self.clock()
+            self._reset_playback_state()
             stats.add_log(f"Streaming song: {song_name} by {artist_name}", 'stream')
-            logger.info(f"Successfully started streaming: {song_name} by {artist_name}")
+            logger.info("Successfully started streaming: %s by %s", song_name, artist_name)
             return True
         else:
             logger.warning(f"Failed to play song: {song_name} (URI: {song_uri})")
             self.current_song = None
             return False
 
-    def get_random_song(self, search_result):
-        if not search_result or 'tracks' not in search_result or 'items' not in search_result['tracks']:
-            logger.debug("get_random_song: Invalid search result format or no tracks.")
+    def _search_for_song(self, spotify_client):
+        search_query = self.get_random_search()
+        if not search_query:
+            logger.warning("Could not generate search query. Skipping song search.")
             return None
+
+        logger.info("Searching for songs with query: '%s'", search_query)
+        search_result = spotify_client.search(search_query)
+        if not search_result:
+            logger.warning(f"Search for '{search_query}' returned no result object.")
+            return None
+
+        song = self.get_random_song(search_result)
+        if not song:
+            logger.warning(f"No suitable songs found in search results for '{search_query}'.")
+            return None
+        return song
+
+    def playable_tracks(self, search_result):
+        if not search_result or 'tracks' not in search_result or 'items' not in search_result['tracks']:
+            logger.debug("playable_tracks: Invalid search result format or no tracks.")
+            return []
         items = search_result['tracks']['items']
         if not items:
-            logger.debug("get_random_song: No items found in tracks.")
-            return None
-        valid_items = [
+            logger.debug("playable_tracks: No items found in tracks.")
+            return []
+        return [
             item for item in items
             if item and isinstance(item, dict) and
                item.get('uri') and
@@ -278,7 +584,10 @@ class Anonymizer:
                item.get('is_playable', True) and
                item.get('duration_ms', 0) > 0
         ]
+
+    def get_random_song(self, search_result):
+        valid_items = self.playable_tracks(search_result)
         if not valid_items:
              logger.debug("No valid (non-local, playable, with URI & duration) tracks found.")
              return None
-        return random.choice(valid_items)
+        return self.rng.choice(valid_items)
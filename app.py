@@ -1,240 +1,276 @@
 import os
 import json
-from datetime import datetime, timedelta
-from flask import Flask, request, redirect, session, render_template, jsonify, url_for
-from spotify_client import SpotifyClient
-from anonymizer import Anonymizer
+from flask import Flask, request, redirect, render_template, jsonify, url_for, Response, stream_with_context
+from engine import Engine, DEFAULT_ACCOUNT
+from metrics import REGISTRY
+from logging_setup import setup_logging
+from activity_planner import ActivityPlanner
 import threading
 import time
 import logging
 import signal
 import sys
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+setup_logging()
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
 app.config['SESSION_TYPE'] = 'filesystem'
 
-class Stats:
-    def __init__(self):
-        self.searches = 0
-        self.streams = 0
-        self.plays = 0
-        self.logs = []
-        self.hourly_data = {
-            'searches': [0] * 24,
-            'streams': [0] * 24,
-            'plays': [0] * 24
-        }
-        self.lock = threading.Lock()
-
-    def add_log(self, message, action_type):
-        with self.lock:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            hour = datetime.now().hour
-
-            self.logs.insert(0, {"time": timestamp, "message": message})
-            if len(self.logs) > 100:
-                self.logs.pop()
-
-            log_prefix = "STAT:"
-            if action_type == 'search':
-                self.searches += 1
-                self.hourly_data['searches'][hour] += 1
-                logger.info(f"{log_prefix} Search performed - Total: {self.searches}")
-            elif action_type == 'stream':
-                self.streams += 1
-                self.hourly_data['streams'][hour] += 1
-                logger.info(f"{log_prefix} Stream started - Total: {self.streams}")
-            elif action_type == 'play':
-                self.plays += 1
-                self.hourly_data['plays'][hour] += 1
-                logger.info(f"{log_prefix} Full play recorded - Total: {self.plays}")
-
-    def get_stats(self):
-        with self.lock:
-            stats_data = {
-                'searches': self.searches,
-                'streams': self.streams,
-                'plays': self.plays,
-                'logs': self.logs.copy(),
-                'hourly_data': {
-                    'searches': self.hourly_data['searches'].copy(),
-                    'streams': self.hourly_data['streams'].copy(),
-                    'plays': self.hourly_data['plays'].copy(),
-                },
-                'is_running': is_running,
-                'is_authorized': spotify_client.is_authorized() if spotify_client else False
-            }
-            return stats_data
-
-stats = Stats()
-spotify_client = SpotifyClient()
-anonymizer = None
-anonymizer_thread = None
-is_running = False
-shutdown_event = threading.Event()
-
-def anonymizer_job():
-    global is_running, anonymizer
+engine = None
+engine_lock = threading.Lock()
 
-    if anonymizer is None:
-        try:
-            logger.info("Initializing Anonymizer instance in worker thread...")
-            anonymizer = Anonymizer()
-            logger.info("Anonymizer initialized successfully in worker thread.")
-        except Exception as e:
-            logger.error(f"CRITICAL: Failed to initialize Anonymizer in worker thread: {e}", exc_info=True)
-            is_running = False
-            return
-
-    logger.info("Anonymizer job thread started.")
-    
-    try:
-        logger.info("Attempting immediate playback on start...")
-        success = anonymizer.start_immediate_playback(spotify_client, stats)
-        if not success:
-            logger.warning("Initial playback failed, will retry in main loop")
-    except Exception as e:
-        logger.error(f"Error during initial playback: {str(e)}", exc_info=True)
-    
-    while is_running and not shutdown_event.is_set():
-        try:
-            if not spotify_client.is_authorized():
-                logger.warning("Spotify client is no longer authorized. Attempting to refresh token...")
-                if not spotify_client.refresh_token():
-                    logger.error("Failed to refresh token. Stopping anonymizer.")
-                    is_running = False
-                    break
-
-            anonymizer.ensure_continuous_playback(spotify_client, stats)
-
-            if anonymizer.can_perform_search():
-                term = anonymizer.get_random_search()
-                if term:
-                    result = spotify_client.search(term)
-                    stats.add_log(f"Performed search: '{term}'", 'search')
-                    anonymizer.update_search_metrics()
-                else:
-                    logger.warning("Skipping search action: No search term generated.")
-
-            time.sleep(0.5)
-
-        except Exception as e:
-            logger.error(f"Error in anonymizer job loop: {str(e)}", exc_info=True)
-            time.sleep(5)
-
-    logger.info("Anonymizer job thread stopped.")
+SSE_KEEPALIVE_INTERVAL = 15
+
+def get_engine():
+    global engine
+    if engine is None:
+        with engine_lock:
+            if engine is None:
+                new_engine = Engine()
+                new_engine.start_background()
+                engine = new_engine
+    return engine
+
+def get_account_id():
+    return request.args.get('account') or DEFAULT_ACCOUNT
+
+def get_session_or_error():
+    account_id = get_account_id()
+    account = get_engine().get_session(account_id)
+    if account is None:
+        logger.warning(f"Request for unknown account: {account_id}")
+        return None, (jsonify({'status': 'error', 'message': f'Unknown account: {account_id}'}), 404)
+    return account, None
 
 @app.route('/')
 def index():
+    account_id = get_account_id()
+    account = get_engine().get_session(account_id)
+    if account is None:
+        # Fall back to the first configured account; "default" may not be one of them
+        account_ids = get_engine().account_ids()
+        if not account_ids:
+            return jsonify({'status': 'error', 'message': f'Unknown account: {account_id}'}), 404
+        return redirect(url_for('index', account=account_ids[0]))
+
     auth_url = None
-    is_auth = spotify_client.is_authorized()
+    is_auth = account.client.is_authorized()
     if not is_auth:
-        auth_url = spotify_client.get_auth_url()
+        auth_url = account.client.get_auth_url(state=account_id)
     return render_template('index.html', auth_url=auth_url, is_authorized=is_auth,
-                          is_running=is_running)
+                          is_running=account.is_running, account=account_id,
+                          accounts=get_engine().account_ids())
 
 @app.route('/callback')
 def callback():
     code = request.args.get('code')
+    account_id = request.args.get('state') or DEFAULT_ACCOUNT
     if not code:
         logger.error("Callback received without authorization code.")
+        return redirect(url_for('index', account=account_id))
+
+    account = get_engine().get_session(account_id)
+    if account is None:
+        logger.error(f"Callback received for unknown account: {account_id}")
         return redirect(url_for('index'))
 
-    result = spotify_client.get_token(code)
+    result = account.client.get_token(code)
     if not result:
-        logger.error("Failed to get token from Spotify after callback.")
-        return redirect(url_for('index'))
+        logger.error(f"Failed to get token from Spotify after callback for account {account_id}.")
+        return redirect(url_for('index', account=account_id))
 
-    logger.info("Spotify authorization successful via callback.")
-    return redirect(url_for('index'))
+    get_engine().schedule_token_refresh(account)
+    logger.info("Spotify authorization successful via callback for account %s.", account_id)
+    return redirect(url_for('index', account=account_id))
+
+@app.route('/accounts', methods=['GET'])
+def list_accounts():
+    return jsonify([get_engine().get_session(a).status() for a in get_engine().account_ids()])
+
+@app.route('/accounts', methods=['POST'])
+def add_account():
+    account_id = (request.get_json(silent=True) or {}).get('account') or request.args.get('account')
+    try:
+        account = get_engine().add_account(account_id)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    return jsonify({'status': 'success', 'account': account.account_id})
 
 @app.route('/stats')
 def get_stats():
-    return jsonify(stats.get_stats())
+    account, error = get_session_or_error()
+    if error:
+        return error
+    stats_data = account.stats.get_stats()
+    stats_data.update(account.status())
+    stats_data['rate_limiter'] = get_engine().rate_limiter.status()
+    stats_data['circuit_breakers'] = account.client.breaker_status()
+    stats_data['response_cache'] = account.client.response_cache.status()
+    return jsonify(stats_data)
+
+@app.route('/schedule')
+def get_schedule():
+    account, error = get_session_or_error()
+    if error:
+        return error
+    anonymizer = account.anonymizer
+    if anonymizer is None:
+        return jsonify({'status': 'error', 'message': 'Anonymizer has not been started for this account'}), 409
+    hours = min(max(request.args.get('hours', 6, type=float), 0.1), 168)
+    # Without a live planner, forecast from a throwaway one built on the same config
+    planner = anonymizer.planner or ActivityPlanner(anonymizer)
+    catalogue = account.client.catalogue if anonymizer.use_playlist_catalogue else None
+    forecast = planner.forecast(hours, catalogue=catalogue)
+    forecast['account'] = account.account_id
+    forecast['planned'] = anonymizer.planner is not None
+    return jsonify(forecast)
+
+@app.route('/metrics')
+def get_metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/history')
+def get_history():
+    account, error = get_session_or_error()
+    if error:
+        return error
+    if not get_engine().event_store:
+        return jsonify({'status': 'error', 'message': 'Event store is disabled'}), 404
+
+    now = time.time()
+    days = request.args.get('days', 7, type=float)
+    since = request.args.get('since', now - days * 86400, type=float)
+    until = request.args.get('until', now, type=float)
+    bucket = max(60, request.args.get('bucket', 3600, type=int))
+    return jsonify({
+        'account': account.account_id,
+        'since': since,
+        'until': until,
+        'bucket': bucket,
+        'buckets': get_engine().event_store.counts(account.account_id, since, until, bucket),
+    })
+
+@app.route('/history/events')
+def get_history_events():
+    account, error = get_session_or_error()
+    if error:
+        return error
+    if not get_engine().event_store:
+        return jsonify({'status': 'error', 'message': 'Event store is disabled'}), 404
+
+    events = get_engine().event_store.query_events(
+        account.account_id,
+        since=request.args.get('since', type=float),
+        until=request.args.get('until', type=float),
+        action_type=request.args.get('type'),
+        limit=min(1000, request.args.get('limit', 100, type=int)),
+    )
+    return jsonify({'account': account.account_id, 'events': events})
+
+@app.route('/events')
+def stream_events():
+    account, error = get_session_or_error()
+    if error:
+        return error
+
+    cursor = account.stats.parse_event_id(request.headers.get('Last-Event-ID') or request.args.get('cursor'))
+
+    def full_stats():
+        stats_data = account.stats.get_stats()
+        stats_data.update(account.status())
+        return stats_data
+
+    def sse(event, data, seq=None):
+        message = f"event: {event}\n"
+        if seq is not None:
+            message += f"id: {account.stats.event_id(seq)}\n"
+        return message + f"data: {json.dumps(data)}\n\n"
+
+    def generate():
+        nonlocal cursor
+        last_status = account.status()
+        changes = account.stats.changes_since(cursor)
+        if changes is None:
+            stats_data = full_stats()
+            cursor = stats_data['seq']
+            yield sse('snapshot', stats_data, cursor)
+        elif changes['logs']:
+            cursor = changes['seq']
+            yield sse('delta', changes, cursor)
+
+        while True:
+            account.stats.wait_for_changes(cursor, timeout=SSE_KEEPALIVE_INTERVAL)
+            sent = False
+            changes = account.stats.changes_since(cursor)
+            if changes is None:
+                stats_data = full_stats()
+                cursor = stats_data['seq']
+                yield sse('snapshot', stats_data, cursor)
+                sent = True
+            elif changes['logs']:
+                cursor = changes['seq']
+                yield sse('delta', changes, cursor)
+                sent = True
+
+            status = account.status()
+            if status != last_status:
+                last_status = status
+                yield sse('status', status)
+                sent = True
+            if not sent:
+                yield ": keepalive\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/start', methods=['POST'])
 def start_anonymizer():
-    global anonymizer_thread, is_running, anonymizer
+    account, error = get_session_or_error()
+    if error:
+        return error
 
-    if not spotify_client.is_authorized():
-        logger.warning("Start request failed: Not authorized with Spotify.")
+    if not account.client.is_authorized() and not account.client.refresh_token():
+        logger.warning(f"Start request failed for {account.account_id}: Not authorized with Spotify.")
         return jsonify({'status': 'error', 'message': 'Not authorized with Spotify'}), 401
 
-    if is_running:
-        logger.warning("Start request failed: Anonymizer already running.")
+    if account.is_running:
+        logger.warning(f"Start request failed for {account.account_id}: Anonymizer already running.")
         return jsonify({'status': 'error', 'message': 'Anonymizer already running'}), 409
 
-    device = spotify_client.get_active_device()
+    device = account.client.get_active_device(use_cache=False)
     if not device:
-        logger.error("Start request failed: No active Spotify device found. Please open Spotify on a device first.")
+        logger.error(f"Start request failed for {account.account_id}: No active Spotify device found. Please open Spotify on a device first.")
         return jsonify({
             'status': 'error', 
             'message': 'No active Spotify device found. Please open Spotify on a device first.'
         }), 400
 
-    if anonymizer is None:
-        try:
-            logger.info("Initializing Anonymizer instance before starting thread...")
-            anonymizer = Anonymizer()
-            logger.info("Anonymizer initialized successfully.")
-        except Exception as e:
-            logger.error(f"Failed to initialize Anonymizer in start endpoint: {e}", exc_info=True)
-            return jsonify({'status': 'error', 'message': f'Failed to initialize anonymizer: {e}'}), 500
-
-    shutdown_event.clear()
-    
-    is_running = True
-    anonymizer_thread = threading.Thread(target=anonymizer_job, daemon=True)
-    anonymizer_thread.start()
-    
-    logger.info("Started anonymizer thread.")
-    stats.add_log("Anonymizer started", 'system')
+    try:
+        get_engine().start(account)
+    except Exception as e:
+        logger.error(f"Failed to initialize Anonymizer in start endpoint: {e}", exc_info=True)
+        return jsonify({'status': 'error', 'message': f'Failed to initialize anonymizer: {e}'}), 500
+
     return jsonify({'status': 'success', 'message': 'Anonymizer started'})
 
 @app.route('/stop', methods=['POST'])
 def stop_anonymizer():
-    global is_running, anonymizer_thread
+    account, error = get_session_or_error()
+    if error:
+        return error
 
-    if not is_running:
-        logger.warning("Stop request ignored: Anonymizer not running.")
+    if not account.is_running:
+        logger.warning(f"Stop request ignored for {account.account_id}: Anonymizer not running.")
         return jsonify({'status': 'error', 'message': 'Anonymizer not running'}), 409
 
-    shutdown_event.set()
-    is_running = False
-
-    if anonymizer_thread and anonymizer_thread.is_alive():
-        logger.info("Waiting for anonymizer thread to stop...")
-        try:
-            anonymizer_thread.join(timeout=5.0)
-            if anonymizer_thread.is_alive():
-                logger.warning("Anonymizer thread did not stop gracefully within timeout.")
-            else:
-                logger.info("Anonymizer thread stopped.")
-        except Exception as e:
-            logger.error(f"Error while waiting for thread to stop: {e}")
-
-    anonymizer_thread = None
-    stats.add_log("Anonymizer stopped", 'system')
-    logger.info("Anonymizer stopped.")
+    get_engine().stop(account)
     return jsonify({'status': 'success', 'message': 'Anonymizer stopped'})
 
 def signal_handler(sig, frame):
-    global is_running
-    
-    if is_running:
-        shutdown_event.set()
-        is_running = False
-        
-        if anonymizer_thread and anonymizer_thread.is_alive():
-            try:
-                anonymizer_thread.join(timeout=3.0)
-            except:
-                pass
-    
+    if engine is not None:
+        engine.shutdown()
     logger.info("Exiting application...")
     sys.exit(0)
 
@@ -242,4 +278,9 @@ signal.signal(signal.SIGINT, signal_handler)
 signal.signal(signal.SIGTERM, signal_handler)
 
 if __name__ == '__main__':
-        app.run(debug=True, port=6969, host='0.0.0.0')
+    debug = os.environ.get('FLASK_DEBUG') == '1'
+    # With the reloader the parent process only watches files; build the engine in the child
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        threading.Thread(target=get_engine, name="spotifuck-startup", daemon=True).start()
+    app.run(debug=debug, use_reloader=debug, port=int(os.environ.get('SPOTIFUCK_PORT', 6969)),
+            host=os.environ.get('SPOTIFUCK_HOST', '0.0.0.0'))
@@ -0,0 +1,309 @@
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter, deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+
+class FakeSpotifyConfig:
+    def __init__(self, latency=0.0, jitter=0.0, rate_429=0.0, retry_after=1, error_rate=0.0,
+                 track_duration_ms=(120000, 300000), tracks_per_search=20, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.track_duration_ms = track_duration_ms
+        self.tracks_per_search = tracks_per_search
+        self.rng = random.Random(seed)
+
+
+class FakeSpotifyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def fake(self):
+        return self.server.fake
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status, payload=None, headers=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        if payload is not None:
+            self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method):
+        body = self._read_body()
+        url = urlsplit(self.path)
+        route = (method, url.path)
+        self.fake.record(route)
+
+        config = self.fake.config
+        delay = config.latency + (config.rng.uniform(-config.jitter, config.jitter) if config.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+        if url.path != "/api/token":
+            roll = config.rng.random()
+            if roll < config.rate_429:
+                self.fake.record(("429", url.path))
+                return self._send(429, {"error": {"status": 429, "message": "API rate limit exceeded"}},
+                                  {"Retry-After": config.retry_after})
+            if roll < config.rate_429 + config.error_rate:
+                self.fake.record(("5xx", url.path))
+                return self._send(503, {"error": {"status": 503, "message": "Service unavailable"}})
+
+        handler, args = self.fake.match_route(route)
+        if handler is None:
+            return self._send(404, {"error": {"status": 404, "message": "Not found"}})
+        status, payload, headers = handler(parse_qs(url.query), self.headers, body, *args)
+        if method == "GET" and status == 200 and not (headers and "ETag" in headers):
+            # Content-derived ETags so clients can revalidate read endpoints
+            etag = '"%s"' % hashlib.md5(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+            headers = dict(headers or {}, ETag=etag)
+            if self.headers.get("If-None-Match") == etag:
+                return self._send(304, None, headers)
+        self._send(status, payload, headers)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+class FakeSpotifyServer:
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or FakeSpotifyConfig()
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._track_id = 0
+        self._durations = {}
+        self._now_playing = None  # (uri, started_at)
+        self._queue_uris = deque()
+        self._context_uris = deque()  # rest of the uris of the last play call
+        self.device_id = "fake-device"  # change it to make the client's cached device go away
+        self.routes = {
+            ("POST", "/api/token"): self._token,
+            ("GET", "/v1/search"): self._search,
+            ("GET", "/v1/me/player/devices"): self._devices,
+            ("PUT", "/v1/me/player/play"): self._play,
+            ("GET", "/v1/me/player/currently-playing"): self._currently_playing,
+            ("POST", "/v1/me/player/queue"): self._queue,
+            ("POST", "/v1/me/player/next"): self._next,
+            ("GET", "/v1/browse/featured-playlists"): self._featured_playlists,
+            ("GET", "/v1/browse/categories"): self._categories,
+        }
+        # (method, path prefix, path suffix) -> handler taking the path segment in between
+        self.prefix_routes = {
+            ("GET", "/v1/browse/categories/", "/playlists"): self._category_playlists,
+        }
+        self.httpd = ThreadingHTTPServer((host, port), FakeSpotifyHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_base(self):
+        return f"{self.base_url}/v1"
+
+    def match_route(self, route):
+        handler = self.routes.get(route)
+        if handler is not None:
+            return handler, ()
+        method, path = route
+        for (route_method, prefix, suffix), handler in self.prefix_routes.items():
+            if method == route_method and path.startswith(prefix) and path.endswith(suffix):
+                segment = path[len(prefix):len(path) - len(suffix)]
+                if segment and "/" not in segment:
+                    return handler, (segment,)
+        return None, ()
+
+    def record(self, route):
+        with self._lock:
+            self.calls[route] += 1
+
+    def start(self):
+        # A short poll interval keeps stop() quick for the tests
+        self._thread = threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _next_track(self):
+        with self._lock:
+            self._track_id += 1
+            track_id = self._track_id
+        low, high = self.config.track_duration_ms
+        uri = f"spotify:track:fake{track_id}"
+        duration_ms = self.config.rng.randint(low, high)
+        with self._lock:
+            self._durations[uri] = duration_ms
+        return {
+            "uri": uri,
+            "name": f"Fake Track {track_id}",
+            "duration_ms": duration_ms,
+            "is_local": False,
+            "is_playable": True,
+            "artists": [{"name": f"Fake Artist {track_id % 97}"}],
+        }
+
+    def _token(self, query, headers, body):
+        return 200, {"access_token": f"fake-{time.time()}", "token_type": "Bearer",
+                     "expires_in": 3600}, None
+
+    def _search(self, query, headers, body):
+        if query.get("type", ["track"])[0] == "playlist":
+            term = query.get("q", [""])[0]
+            return 200, {"playlists": self._playlist_page(f"search-{term}", query, total=100)}, None
+        items = [self._next_track() for _ in range(self.config.tracks_per_search)]
+        return 200, {"tracks": {"items": items, "total": len(items)}}, None
+
+    def _devices(self, query, headers, body):
+        return 200, {"devices": [{"id": self.device_id, "name": "Fake Device", "is_active": True}]}, None
+
+    def _device_error(self, query):
+        device_id = query.get("device_id", [None])[0]
+        if device_id is not None and device_id != self.device_id:
+            return 404, {"error": {"status": 404, "message": "Device not found"}}, None
+        return None
+
+    def _play(self, query, headers, body):
+        error = self._device_error(query)
+        if error:
+            return error
+        try:
+            uris = json.loads(body or b"{}").get("uris") or []
+        except ValueError:
+            uris = []
+        with self._lock:
+            self._now_playing = (uris[0], time.time()) if uris else None
+            self._context_uris = deque(uris[1:])
+        return 204, None, None
+
+    def _next(self, query, headers, body):
+        error = self._device_error(query)
+        if error:
+            return error
+        now = time.time()
+        with self._lock:
+            self._advance(now)
+            upcoming = self._queue_uris or self._context_uris
+            self._now_playing = (upcoming.popleft(), now) if upcoming else None
+        return 204, None, None
+
+    def _queue(self, query, headers, body):
+        error = self._device_error(query)
+        if error:
+            return error
+        uri = query.get("uri", [None])[0]
+        if not uri:
+            return 400, {"error": {"status": 400, "message": "Missing uri"}}, None
+        with self._lock:
+            self._queue_uris.append(uri)
+        return 204, None, None
+
+    def _advance(self, now):
+        # Move through queued tracks whose predecessor has finished; caller holds the lock
+        while self._now_playing:
+            uri, started_at = self._now_playing
+            duration_ms = self._durations.get(uri)
+            if duration_ms is None or now < started_at + duration_ms / 1000:
+                return
+            upcoming = self._queue_uris or self._context_uris
+            if not upcoming:
+                self._now_playing = None
+                return
+            self._now_playing = (upcoming.popleft(), started_at + duration_ms / 1000)
+
+    def _currently_playing(self, query, headers, body):
+        now = time.time()
+        with self._lock:
+            self._advance(now)
+            now_playing = self._now_playing
+            duration_ms = self._durations.get(now_playing[0]) if now_playing else None
+        if not now_playing or duration_ms is None:
+            return 204, None, None
+        uri, started_at = now_playing
+        progress_ms = int((now - started_at) * 1000)
+        state = {
+            "is_playing": True,
+            "progress_ms": progress_ms,
+            "item": {"uri": uri, "duration_ms": duration_ms},
+            "context": None,
+        }
+        etag = '"%s"' % hashlib.md5(json.dumps(state, sort_keys=True).encode()).hexdigest()
+        if headers.get("If-None-Match") == etag:
+            return 304, None, {"ETag": etag}
+        return 200, state, {"ETag": etag}
+
+    def _playlist_page(self, source, query, total):
+        # Stable pages of playlists so repeated reads produce the same ETag
+        limit = int(query.get("limit", ["20"])[0])
+        offset = int(query.get("offset", ["0"])[0])
+        items = [{"uri": f"spotify:playlist:fake-{source}-{i}", "name": f"Fake Playlist {source} {i}"}
+                 for i in range(offset, min(offset + limit, total))]
+        return {"items": items, "offset": offset, "total": total}
+
+    def _featured_playlists(self, query, headers, body):
+        return 200, {"playlists": self._playlist_page("featured", query, total=120)}, None
+
+    def _categories(self, query, headers, body):
+        limit = int(query.get("limit", ["20"])[0])
+        items = [{"id": f"category{i}", "name": f"Fake Category {i}"} for i in range(min(limit, 12))]
+        return 200, {"categories": {"items": items, "total": len(items)}}, None
+
+    def _category_playlists(self, query, headers, body, category_id):
+        return 200, {"playlists": self._playlist_page(category_id, query, total=40)}, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the Spotify Web API")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--latency", type=float, default=0.0, help="added latency per request, seconds")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    config = FakeSpotifyConfig(latency=args.latency, jitter=args.jitter, rate_429=args.rate_429,
+                               retry_after=args.retry_after, error_rate=args.error_rate)
+    server = FakeSpotifyServer(config, port=args.port)
+    print(f"Fake Spotify API listening on {server.base_url}")
+    print(f"  SPOTIFY_API_BASE={server.api_base} SPOTIFY_ACCOUNTS_BASE={server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
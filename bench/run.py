@@ -0,0 +1,181 @@
+import argparse
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+
+# The benchmarks must never touch the real event store or token files
+os.environ["SPOTIFUCK_DB"] = ""
+
+from bench.fake_spotify import FakeSpotifyConfig, FakeSpotifyServer
+from http_transport import HttpTransport
+from rate_limiter import RateLimiter
+from spotify_client import SpotifyClient
+from anonymizer import Anonymizer
+from stats import Stats
+from engine import Engine
+from wordlist import load_word_list
+
+
+def percentiles(samples, points=(50, 90, 99)):
+    if not samples:
+        return {f"p{p}": None for p in points}
+    ordered = sorted(samples)
+    return {
+        f"p{p}": round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000, 3)
+        for p in points
+    }
+
+
+def current_rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+TOKEN_DIR = tempfile.mkdtemp(prefix="spotifuck-bench-")
+BENCH_WORDS = ["music", "pop", "rock", "jazz", "chill", "party", "focus", "indie", "dance", "study"]
+
+
+def make_client(server, transport, rate_limiter):
+    token_file = os.path.join(TOKEN_DIR, "token_info.json")
+    client = SpotifyClient(transport=transport, token_file=token_file, rate_limiter=rate_limiter)
+    client.token_info = {"access_token": "bench", "refresh_token": "bench",
+                         "expires_at": time.time() + 86400}
+    return client
+
+
+def make_anonymizer():
+    # Anonymizer() would otherwise create wordlist.txt in the working directory
+    path = os.path.join(TOKEN_DIR, "wordlist.txt")
+    if not os.path.exists(path):
+        with open(path, "w") as f:
+            f.write("\n".join(BENCH_WORDS))
+    return Anonymizer(search_words=load_word_list(path))
+
+
+def timed(fn, iterations):
+    samples = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    return {"ops_per_sec": round(iterations / elapsed, 1), **percentiles(samples)}
+
+
+def bench_client_calls(server, transport, rate_limiter, iterations):
+    client = make_client(server, transport, rate_limiter)
+    return {
+        "search": timed(lambda: client.search("bench query"), iterations),
+        "get_active_device": timed(lambda: client.get_active_device(use_cache=False), iterations),
+        "get_active_device_cached": timed(client.get_active_device, iterations),
+        "play_song": timed(lambda: client.play_song("spotify:track:fake1"), iterations),
+    }
+
+
+def bench_song_switch(server, transport, rate_limiter, iterations, use_track_pool):
+    client = make_client(server, transport, rate_limiter)
+    anonymizer = make_anonymizer()
+    stats = Stats("bench")
+    if use_track_pool:
+        from track_pool import TrackPool
+        anonymizer.track_pool = TrackPool(client, anonymizer, high_water=max(20, iterations))
+        anonymizer.track_pool._refill()
+    return timed(lambda: anonymizer._start_new_stream(client, stats), iterations)
+
+
+def bench_engine(server, transport, rate_limiter, accounts, duration, workers):
+    engine = Engine(account_ids=[f"bench{i}" for i in range(accounts)], max_workers=workers,
+                    transport=transport, rate_limiter=rate_limiter, token_dir=TOKEN_DIR)
+    for session in engine.sessions.values():
+        session.client.token_info = {"access_token": "bench", "refresh_token": "bench",
+                                     "expires_at": time.time() + 86400}
+        anonymizer = make_anonymizer()
+        anonymizer.min_song_duration_range = (0.2, 0.5)
+        anonymizer.default_context_duration = 1
+        anonymizer.safety_buffer = 0.1
+        anonymizer.search_delay_range = (0.05, 0.2)
+        anonymizer.max_searches_per_minute = 10000
+        session.anonymizer = anonymizer
+
+    calls_before = sum(server.calls.values())
+    cpu_before = time.process_time()
+    start = time.perf_counter()
+    for session in engine.sessions.values():
+        engine.start(session)
+    time.sleep(duration)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_before
+
+    totals = {"searches": 0, "streams": 0, "plays": 0}
+    for session in engine.sessions.values():
+        snapshot = session.stats.snapshot()
+        for key in totals:
+            totals[key] += snapshot[key]
+    engine.shutdown()
+
+    actions = totals["searches"] + totals["streams"]
+    return {
+        "accounts": accounts,
+        "duration_s": round(elapsed, 2),
+        "actions_per_sec": round(actions / elapsed, 1),
+        "http_calls_per_sec": round((sum(server.calls.values()) - calls_before) / elapsed, 1),
+        "cpu_percent": round(100 * cpu / elapsed, 1),
+        **totals,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a local Spotify API stand-in")
+    parser.add_argument("--latency", type=float, default=0.005, help="fake API latency, seconds")
+    parser.add_argument("--jitter", type=float, default=0.002)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--accounts", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=10.0, help="engine benchmark duration, seconds")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--json", metavar="PATH", help="also write results as JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    config = FakeSpotifyConfig(latency=args.latency, jitter=args.jitter, rate_429=args.rate_429,
+                               error_rate=args.error_rate, track_duration_ms=(500, 1500), seed=1)
+    server = FakeSpotifyServer(config).start()
+    transport = HttpTransport(api_base=server.api_base, accounts_base=server.base_url)
+    rate_limiter = RateLimiter(rate=100000, burst=100000)
+
+    rss_start = current_rss_kb()
+    results = {"config": vars(args)}
+    try:
+        results["client_calls"] = bench_client_calls(server, transport, rate_limiter, args.iterations)
+        results["song_switch"] = bench_song_switch(server, transport, rate_limiter, args.iterations, False)
+        results["song_switch_pooled"] = bench_song_switch(server, transport, rate_limiter, args.iterations, True)
+        results["engine"] = bench_engine(server, transport, rate_limiter, args.accounts,
+                                         args.duration, args.workers)
+    finally:
+        server.stop()
+    results["memory"] = {
+        "rss_start_kb": rss_start,
+        "rss_end_kb": current_rss_kb(),
+        "rss_peak_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    results["fake_api_calls"] = {f"{k[0]} {k[1]}": v for k, v in sorted(server.calls.items())}
+
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import random
+import threading
+import time
+import logging
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    pass
+
+
+def backoff_delay(attempt, base, cap, rng=random):
+    # Exponential backoff with "equal jitter": at least half the step, never above cap
+    step = min(cap, base * (2 ** max(0, attempt)))
+    return step / 2 + rng.uniform(0, step / 2)
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, reset_timeout=5.0, max_reset_timeout=300.0,
+                 probe_timeout=60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0  # consecutive opens without a successful probe; drives the backoff
+        self.open_until = 0
+        # A probe that never reports back gives up its slot after probe_timeout seconds
+        self.probe_timeout = probe_timeout
+        self._probing = False
+        self._probe_started = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() < self.open_until:
+                    return False
+                self.state = HALF_OPEN
+                self._probing = False
+            # Half-open: let exactly one probe through until it reports back
+            now = time.monotonic()
+            if self._probing and now - self._probe_started < self.probe_timeout:
+                return False
+            self._probing = True
+            self._probe_started = now
+            return True
+
+    def on_success(self):
+        if self.state == CLOSED and not self.failures:
+            return
+        with self.lock:
+            if self.state != CLOSED:
+                logger.info("Circuit %s closed again", self.name)
+            self.state = CLOSED
+            self.failures = 0
+            self.trips = 0
+            self._probing = False
+
+    def on_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == CLOSED and self.failures < self.failure_threshold:
+                return
+            timeout = backoff_delay(self.trips, self.reset_timeout, self.max_reset_timeout)
+            self.trips += 1
+            self.state = OPEN
+            self.open_until = time.monotonic() + timeout
+            self._probing = False
+        logger.warning("Circuit %s opened for %.1f s after %d failures", self.name, timeout, self.failures)
+
+    def release(self):
+        # The call never reached the endpoint (e.g. a local rate limit timeout) or failed in an
+        # unexpected way; free the probe slot without judging the endpoint
+        with self.lock:
+            self._probing = False
+
+    def retry_in(self):
+        with self.lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.open_until - time.monotonic())
+
+    def status(self):
+        with self.lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'trips': self.trips,
+                'retry_in': round(max(0.0, self.open_until - time.monotonic()), 3) if self.state == OPEN else 0.0,
+            }
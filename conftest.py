@@ -0,0 +1,49 @@
+# Lets the tests import the top-level modules when pytest is run from the repository root
+import time
+
+import pytest
+
+from bench.fake_spotify import FakeSpotifyServer
+from engine import Engine
+from http_transport import HttpTransport
+from rate_limiter import RateLimiter
+from spotify_client import SpotifyClient
+
+
+@pytest.fixture
+def make_engine(tmp_path, monkeypatch):
+    # Builds an Engine, or something that owns one like a Daemon, in a scratch directory with the
+    # event store off, and shuts the engines down after the test
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("SPOTIFUCK_DB", "")
+    built = []
+
+    def make(factory=Engine, **kwargs):
+        owner = factory(**kwargs)
+        built.append(owner)
+        return owner
+
+    yield make
+    for owner in built:
+        getattr(owner, "engine", owner).shutdown()
+
+
+@pytest.fixture
+def fake_spotify():
+    server = FakeSpotifyServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def make_client(fake_spotify, tmp_path):
+    # SpotifyClient talking to the fake API; authorized unless told otherwise
+    def make(token_file=None, authorized=True):
+        transport = HttpTransport(api_base=fake_spotify.api_base, accounts_base=fake_spotify.base_url)
+        client = SpotifyClient(transport=transport, token_file=str(token_file or tmp_path / "token.json"),
+                               rate_limiter=RateLimiter(rate=1000, burst=1000))
+        if authorized:
+            client.token_info = {"access_token": "a", "refresh_token": "r", "expires_at": time.time() + 3600}
+        return client
+
+    return make
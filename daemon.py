@@ -0,0 +1,265 @@
+import os
+import sys
+import json
+import queue
+import signal
+import socket
+import argparse
+import threading
+import logging
+import socketserver
+
+# Headless entry point: runs the engine without Flask. Accounts must already have a saved
+# token (authorize them once through the webui); control is via signals or a Unix socket.
+from engine import Engine, load_account_ids
+from metrics import REGISTRY
+from activity_planner import ActivityPlanner
+from logging_setup import setup_logging, stop_logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET = "spotifuck.sock"
+
+
+class ControlHandler(socketserver.StreamRequestHandler):
+    # One command per line ("start alice", "status"), answered with one JSON line
+    def handle(self):
+        for line in self.rfile:
+            words = line.decode("utf-8", "replace").split()
+            if not words:
+                continue
+            try:
+                reply = self.server.daemon.command(words[0], words[1:])
+            except Exception as e:
+                logger.error(f"Control command {words!r} failed: {str(e)}", exc_info=True)
+                reply = {'status': 'error', 'message': str(e)}
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class ControlServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class Daemon:
+    def __init__(self, account_ids=None, workers=None, socket_path=None):
+        self.engine = Engine(account_ids=account_ids, max_workers=workers)
+        self.socket_path = socket_path
+        self.control = None
+        self.stopping = threading.Event()
+        # Signal handlers only queue work here; the main loop does it outside the handler.
+        # SimpleQueue.put is reentrant, so it is safe to call from a signal handler.
+        self._requests = queue.SimpleQueue()
+
+    def run(self, autostart=True):
+        self.engine.start_background()
+        if self.socket_path:
+            self._open_control_socket()
+        if autostart:
+            self.start_accounts(self.engine.account_ids())
+        logger.info("Daemon running with %d account(s)", len(self.engine.sessions))
+        while not self.stopping.is_set():
+            try:
+                request = self._requests.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            self._process(request)
+        self._close()
+
+    def _process(self, request):
+        try:
+            if request == "reload":
+                self.reload_accounts()
+            elif request == "status":
+                self.log_status()
+        except Exception as e:
+            # Keep the daemon alive; a failed reload can simply be retried
+            logger.error(f"Daemon request {request!r} failed: {str(e)}", exc_info=True)
+
+    def _open_control_socket(self):
+        if os.path.exists(self.socket_path):
+            # Refuse to steal the socket of a daemon that is still alive
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+                raise RuntimeError(f"Another daemon is listening on {self.socket_path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.remove(self.socket_path)
+            finally:
+                probe.close()
+        old_umask = os.umask(0o177)
+        try:
+            self.control = ControlServer(self.socket_path, ControlHandler)
+        finally:
+            os.umask(old_umask)
+        self.control.daemon = self
+        threading.Thread(target=self.control.serve_forever, name="spotifuck-control", daemon=True).start()
+        logger.info("Control socket listening on %s", self.socket_path)
+
+    def _close(self):
+        if self.control:
+            self.control.shutdown()
+            self.control.server_close()
+            try:
+                os.remove(self.socket_path)
+            except OSError:
+                pass
+        self.engine.shutdown()
+        logger.info("Daemon stopped.")
+
+    def request_stop(self, *_):
+        self.stopping.set()
+        self._requests.put(None)
+
+    def request_reload(self, *_):
+        self._requests.put("reload")
+
+    def request_status(self, *_):
+        self._requests.put("status")
+
+    def reload_accounts(self):
+        added = [a for a in load_account_ids() if self.engine.get_session(a) is None]
+        if not added:
+            # start_accounts([]) means every account, which would restart deliberately stopped ones
+            logger.info("Reloaded accounts, none new")
+            return added
+        for account_id in added:
+            self.engine.add_account(account_id)
+        self.start_accounts(added)
+        logger.info("Reloaded accounts, %d new", len(added))
+        return added
+
+    def log_status(self):
+        for status in self.status():
+            logger.info("Account %(account)s: running=%(is_running)s authorized=%(is_authorized)s", status)
+
+    def _sessions(self, account_ids):
+        if not account_ids:
+            return list(self.engine.sessions.values())
+        sessions = []
+        for account_id in account_ids:
+            session = self.engine.get_session(account_id)
+            if session is None:
+                raise ValueError(f"Unknown account: {account_id}")
+            sessions.append(session)
+        return sessions
+
+    def start_accounts(self, account_ids):
+        started = []
+        for session in self._sessions(account_ids):
+            if session.is_running:
+                continue
+            if not session.client.is_authorized() and not session.client.refresh_token():
+                logger.warning(f"[{session.account_id}] Not authorized, authorize it through the webui first.")
+                continue
+            self.engine.start(session)
+            started.append(session.account_id)
+        return started
+
+    def stop_accounts(self, account_ids):
+        stopped = []
+        for session in self._sessions(account_ids):
+            if session.is_running:
+                self.engine.stop(session)
+                stopped.append(session.account_id)
+        return stopped
+
+    def status(self):
+        return [session.status() for session in self.engine.sessions.values()]
+
+    def command(self, name, args):
+        if name == "status":
+            return {'status': 'ok', 'accounts': self.status()}
+        if name == "start":
+            return {'status': 'ok', 'started': self.start_accounts(args)}
+        if name == "stop":
+            return {'status': 'ok', 'stopped': self.stop_accounts(args)}
+        if name == "stats":
+            stats = {}
+            for session in self._sessions(args):
+                snapshot = session.stats.snapshot()
+                stats[session.account_id] = {k: snapshot[k] for k in ('searches', 'streams', 'plays')}
+            return {'status': 'ok', 'stats': stats}
+        if name == "schedule":
+            forecasts = {}
+            for session in self._sessions(args):
+                anonymizer = session.anonymizer
+                if anonymizer is not None:
+                    planner = anonymizer.planner or ActivityPlanner(anonymizer)
+                    forecasts[session.account_id] = planner.forecast()['totals']
+            return {'status': 'ok', 'schedule': forecasts}
+        if name == "metrics":
+            return {'status': 'ok', 'metrics': REGISTRY.render()}
+        if name == "reload":
+            self.reload_accounts()
+            return {'status': 'ok', 'accounts': self.engine.account_ids()}
+        if name == "shutdown":
+            self.request_stop()
+            return {'status': 'ok'}
+        return {'status': 'error', 'message': f"Unknown command: {name}"}
+
+
+def send_command(socket_path, words, timeout=10):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall((" ".join(words) + "\n").encode("utf-8"))
+        reply = b""
+        while not reply.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            reply += chunk
+    return json.loads(reply)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Spotifuck headless, without the webui")
+    parser.add_argument("--socket", default=os.environ.get("SPOTIFUCK_CONTROL_SOCKET", DEFAULT_SOCKET),
+                        help="control socket path, empty to disable")
+    commands = parser.add_subparsers(dest="command")
+
+    run = commands.add_parser("run", help="run the daemon in the foreground")
+    run.add_argument("--accounts", help="comma separated account ids (default: SPOTIFUCK_ACCOUNTS and tokens/)")
+    run.add_argument("--workers", type=int)
+    run.add_argument("--no-autostart", action="store_true", help="wait for a start command instead")
+
+    ctl = commands.add_parser("ctl", help="send a command to a running daemon")
+    ctl.add_argument("words", nargs="+", metavar="COMMAND",
+                     help="status | start [ACCOUNT...] | stop [ACCOUNT...] | stats [ACCOUNT...] | schedule [ACCOUNT...] | metrics | reload | shutdown")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "ctl":
+        if not args.socket:
+            parser.error("ctl needs a control socket")
+        try:
+            reply = send_command(args.socket, args.words)
+        except OSError as e:
+            print(f"Cannot reach daemon on {args.socket}: {e}", file=sys.stderr)
+            return 1
+        if "metrics" in reply:
+            print(reply["metrics"], end="")
+        else:
+            print(json.dumps(reply, indent=2))
+        return 0 if reply.get("status") == "ok" else 1
+
+    setup_logging()
+    account_ids = None
+    if getattr(args, "accounts", None):
+        account_ids = [a.strip() for a in args.accounts.split(",") if a.strip()]
+    daemon = Daemon(account_ids=account_ids, workers=getattr(args, "workers", None),
+                    socket_path=args.socket or None)
+    signal.signal(signal.SIGINT, daemon.request_stop)
+    signal.signal(signal.SIGTERM, daemon.request_stop)
+    signal.signal(signal.SIGHUP, daemon.request_reload)
+    signal.signal(signal.SIGUSR1, daemon.request_status)
+    try:
+        daemon.run(autostart=not getattr(args, "no_autostart", False))
+    finally:
+        stop_logging()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,383 @@
+import os
+import re
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from spotify_client import SpotifyClient
+from anonymizer import Anonymizer
+from scheduler import DeadlineScheduler
+from stats import Stats
+from event_store import open_event_store
+from track_pool import TrackPool
+from playlist_catalogue import PlaylistCatalogue
+from activity_planner import ActivityPlanner
+from http_transport import get_shared_transport
+from rate_limiter import get_shared_rate_limiter
+from circuit_breaker import backoff_delay
+from metrics import JOB_SECONDS, QUEUE_DEPTH, SESSIONS, RATE_LIMIT
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ACCOUNT = "default"
+TOKEN_DIR = "tokens"
+ACCOUNT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+PLAYBACK_RETRY_DELAY = 1.0
+ERROR_RETRY_DELAY = 5
+MAX_RETRY_DELAY = 300
+TOKEN_REFRESH_RETRY_DELAY = 30
+SEARCH_BACKLOG_DELAY = 1.0
+
+
+def token_file_for(account_id, token_dir=None):
+    # token_dir overrides both locations, e.g. to keep the benchmarks off the real token files
+    if token_dir is not None:
+        return os.path.join(token_dir, f"{account_id}.json")
+    if account_id == DEFAULT_ACCOUNT:
+        return "token_info.json"
+    return os.path.join(TOKEN_DIR, f"{account_id}.json")
+
+
+def load_account_ids():
+    account_ids = [a.strip() for a in os.environ.get("SPOTIFUCK_ACCOUNTS", DEFAULT_ACCOUNT).split(",")]
+    if os.path.isdir(TOKEN_DIR):
+        for name in sorted(os.listdir(TOKEN_DIR)):
+            if name.endswith(".json"):
+                account_ids.append(name[:-len(".json")])
+    seen = []
+    for account_id in account_ids:
+        if account_id and account_id not in seen and ACCOUNT_ID_PATTERN.match(account_id):
+            seen.append(account_id)
+    return seen or [DEFAULT_ACCOUNT]
+
+
+class AccountSession:
+    def __init__(self, account_id, transport=None, rate_limiter=None, event_store=None, token_dir=None):
+        self.account_id = account_id
+        self.client = SpotifyClient(
+            transport=transport, token_file=token_file_for(account_id, token_dir), rate_limiter=rate_limiter
+        )
+        self.stats = Stats(account_id, event_store=event_store)
+        self.anonymizer = None
+        self.is_running = False
+        # Bumped on every start/stop so callbacks scheduled for an earlier run are dropped
+        self.generation = 0
+        self.failures = 0  # consecutive failed playback actions, drives the retry backoff
+        self.lock = threading.Lock()
+
+    def status(self):
+        return {
+            'account': self.account_id,
+            'is_running': self.is_running,
+            'is_authorized': self.client.is_authorized(),
+            'failures': self.failures,
+        }
+
+
+class Engine:
+    def __init__(self, account_ids=None, max_workers=None, transport=None, rate_limiter=None,
+                 event_store=None, max_search_workers=None, token_dir=None, max_prefetch_workers=None):
+        self.token_dir = token_dir
+        self.transport = transport or get_shared_transport()
+        self.rate_limiter = rate_limiter or get_shared_rate_limiter()
+        self.event_store = event_store or open_event_store()
+        self.max_workers = max_workers or int(os.environ.get("SPOTIFUCK_WORKERS", "8"))
+        self.scheduler = DeadlineScheduler()
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="spotifuck-worker"
+        )
+        # Searches get their own pool so a slow search never holds up a due song switch
+        self.max_search_workers = max_search_workers or int(os.environ.get("SPOTIFUCK_SEARCH_WORKERS", "4"))
+        self.search_executor = ThreadPoolExecutor(
+            max_workers=self.max_search_workers, thread_name_prefix="spotifuck-search"
+        )
+        self._searches_in_flight = 0
+        # Track pool refills and catalogue refreshes run many requests in a row; keeping them off both
+        # pools means neither a due switch nor the search pacing ever waits behind them
+        self.max_prefetch_workers = max_prefetch_workers or int(os.environ.get("SPOTIFUCK_PREFETCH_WORKERS", "2"))
+        self.prefetch_executor = ThreadPoolExecutor(
+            max_workers=self.max_prefetch_workers, thread_name_prefix="spotifuck-prefetch"
+        )
+        self.sessions = {}
+        self._lock = threading.Lock()
+        self._scheduler_thread = None
+        self._background = False
+
+        for account_id in account_ids or load_account_ids():
+            self.add_account(account_id)
+        QUEUE_DEPTH.set_function(self.queue_depths)
+        SESSIONS.set_function(self.session_counts)
+        RATE_LIMIT.set_function(lambda: {(): self.rate_limiter.rate})
+        logger.info("Engine initialized with %d account(s) and %d worker(s)",
+                    len(self.sessions), self.max_workers)
+
+    def add_account(self, account_id):
+        if not ACCOUNT_ID_PATTERN.match(account_id or ""):
+            raise ValueError(f"Invalid account id: {account_id!r}")
+        with self._lock:
+            session = self.sessions.get(account_id)
+            if session is None:
+                session = AccountSession(
+                    account_id, transport=self.transport, rate_limiter=self.rate_limiter,
+                    event_store=self.event_store, token_dir=self.token_dir,
+                )
+                self.sessions[account_id] = session
+                added = True
+            else:
+                added = False
+        if added and self._background:
+            self.schedule_token_refresh(session)
+        return session
+
+    def start_background(self):
+        # Kept out of __init__ so constructing an engine never starts threads or hits the network
+        self._background = True
+        self._ensure_scheduler()
+        for session in list(self.sessions.values()):
+            self.schedule_token_refresh(session)
+
+    def get_session(self, account_id):
+        return self.sessions.get(account_id)
+
+    def account_ids(self):
+        return list(self.sessions)
+
+    def _ensure_scheduler(self):
+        with self._lock:
+            if self._scheduler_thread is None or not self._scheduler_thread.is_alive():
+                self._scheduler_thread = threading.Thread(
+                    target=self.scheduler.run, name="spotifuck-scheduler", daemon=True
+                )
+                self._scheduler_thread.start()
+
+    def _schedule(self, session, action, due):
+        generation = session.generation
+        self.scheduler.schedule(
+            (session.account_id, action.__name__), due,
+            lambda: self.executor.submit(self._run_action, session, generation, action),
+        )
+
+    def _run_action(self, session, generation, action):
+        with session.lock:
+            if not session.is_running or session.generation != generation:
+                return
+            if not self._ensure_authorized(session):
+                return
+            start = time.perf_counter()
+            try:
+                due = action(session)
+            except Exception as e:
+                logger.error(f"[{session.account_id}] Error in {action.__name__}: {str(e)}", exc_info=True)
+                due = self._retry_time(session, ERROR_RETRY_DELAY)
+            JOB_SECONDS.observe(time.perf_counter() - start, action.__name__.lstrip('_'))
+            if due is not None and session.is_running and session.generation == generation:
+                self._schedule(session, action, due)
+
+    def _ensure_authorized(self, session):
+        if session.client.is_authorized():
+            return True
+        logger.warning(f"[{session.account_id}] Spotify client is no longer authorized. Attempting to refresh token...")
+        if session.client.refresh_token():
+            return True
+        logger.error(f"[{session.account_id}] Failed to refresh token. Stopping anonymizer.")
+        self._halt(session)
+        return False
+
+    def schedule_token_refresh(self, session, due=None):
+        if due is None:
+            due = session.client.next_refresh_time()
+            if due is None:
+                return
+        self._ensure_scheduler()
+        self.scheduler.schedule(
+            (session.account_id, 'token_refresh'), due,
+            lambda: self.executor.submit(self._token_refresh, session),
+        )
+
+    def _token_refresh(self, session):
+        client = session.client
+        due = client.next_refresh_time()
+        if due is None:
+            return
+        if due <= time.time():
+            if client.refresh_token():
+                logger.info("[%s] Token refreshed ahead of expiry.", session.account_id)
+            elif client.next_refresh_time() is not None:
+                logger.warning(f"[{session.account_id}] Background token refresh failed, retrying in {TOKEN_REFRESH_RETRY_DELAY}s.")
+                self.schedule_token_refresh(session, time.time() + TOKEN_REFRESH_RETRY_DELAY)
+                return
+        self.schedule_token_refresh(session)
+
+    def _initial_playback(self, session):
+        try:
+            logger.info("[%s] Attempting immediate playback on start...", session.account_id)
+            if not session.anonymizer.start_immediate_playback(session.client, session.stats):
+                logger.warning(f"[{session.account_id}] Initial playback failed, will retry in main loop")
+        except Exception as e:
+            logger.error(f"[{session.account_id}] Error during initial playback: {str(e)}", exc_info=True)
+        self._schedule(session, self._playback, session.anonymizer.next_change_time())
+        self._schedule_search(session, session.anonymizer.next_search_deadline())
+        return None
+
+    def _retry_time(self, session, base_delay):
+        session.failures += 1
+        delay = backoff_delay(session.failures - 1, base_delay, MAX_RETRY_DELAY)
+        logger.info("[%s] Retrying in %.1fs after %d consecutive failure(s).", session.account_id, delay, session.failures)
+        return time.time() + delay
+
+    def _playback(self, session):
+        anonymizer = session.anonymizer
+        if anonymizer.ensure_continuous_playback(session.client, session.stats):
+            session.failures = 0
+            return anonymizer.next_change_time()
+        return self._retry_time(session, PLAYBACK_RETRY_DELAY)
+
+    def _schedule_search(self, session, due):
+        generation = session.generation
+        self.scheduler.schedule(
+            (session.account_id, self._search.__name__), due,
+            lambda: self._dispatch_search(session, generation),
+        )
+
+    def _dispatch_search(self, session, generation):
+        # Runs on the scheduler thread and only does pacing bookkeeping; the request goes to the search pool
+        if not session.is_running or session.generation != generation:
+            return
+        due = None
+        try:
+            anonymizer = session.anonymizer
+            with self._lock:
+                backlogged = self._searches_in_flight >= 2 * self.max_search_workers
+            if backlogged:
+                due = time.time() + SEARCH_BACKLOG_DELAY
+                return
+            if anonymizer.reserve_search():
+                term = anonymizer.get_random_search()
+                if term:
+                    with self._lock:
+                        self._searches_in_flight += 1
+                    try:
+                        self.search_executor.submit(self._search, session, generation, term)
+                    except Exception:
+                        with self._lock:
+                            self._searches_in_flight -= 1
+                        raise
+                else:
+                    logger.warning(f"[{session.account_id}] Skipping search action: No search term generated.")
+            due = anonymizer.next_search_deadline()
+        except Exception as e:
+            logger.error(f"[{session.account_id}] Error dispatching search: {str(e)}", exc_info=True)
+            due = time.time() + ERROR_RETRY_DELAY
+        finally:
+            # Always re-arm, otherwise one failure would end this account's searches for good
+            if session.is_running and session.generation == generation:
+                self._schedule_search(session, due if due is not None else time.time() + ERROR_RETRY_DELAY)
+
+    def _search(self, session, generation, term):
+        start = time.perf_counter()
+        try:
+            # The token check may refresh over the network, so it runs here rather than on the scheduler thread
+            if session.is_running and session.generation == generation and self._ensure_authorized(session):
+                session.client.search(term)
+                session.stats.add_log(f"Performed search: '{term}'", 'search')
+        except Exception as e:
+            logger.error(f"[{session.account_id}] Error in _search: {str(e)}", exc_info=True)
+        finally:
+            with self._lock:
+                self._searches_in_flight -= 1
+            JOB_SECONDS.observe(time.perf_counter() - start, 'search')
+
+    def start(self, session):
+        if session.anonymizer is None:
+            logger.info("[%s] Initializing Anonymizer instance...", session.account_id)
+            session.anonymizer = Anonymizer()
+        anonymizer = session.anonymizer
+        if anonymizer.use_track_pool and anonymizer.track_pool is None:
+            anonymizer.track_pool = TrackPool(
+                session.client, anonymizer,
+                low_water=anonymizer.track_pool_low_water,
+                high_water=anonymizer.track_pool_high_water,
+                max_age=anonymizer.track_pool_max_age,
+                executor=self.prefetch_executor,
+            )
+        if anonymizer.track_pool:
+            anonymizer.track_pool.request_refill()
+        if anonymizer.use_playlist_catalogue:
+            # The catalogue belongs to the client, so it survives anonymizer restarts
+            if session.client.catalogue is None:
+                session.client.catalogue = PlaylistCatalogue(session.client, executor=self.prefetch_executor)
+            session.client.catalogue.search_words = anonymizer.search_words
+            session.client.catalogue.request_refresh()
+        else:
+            session.client.catalogue = None
+        if anonymizer.use_planner and anonymizer.planner is None:
+            anonymizer.planner = ActivityPlanner(anonymizer)
+
+        self._ensure_scheduler()
+        with session.lock:
+            session.generation += 1
+            session.failures = 0
+            session.is_running = True
+            # A track queued before a stop may still sit in the device queue; hard-playing it
+            # on the first switch would play it twice
+            anonymizer.queued_song = None
+        self._schedule(session, self._initial_playback, time.time())
+        session.stats.add_log("Anonymizer started", 'system')
+        logger.info("[%s] Anonymizer started.", session.account_id)
+
+    def _halt(self, session):
+        session.is_running = False
+        session.generation += 1
+        for action in (self._initial_playback, self._playback, self._search):
+            self.scheduler.cancel((session.account_id, action.__name__))
+
+    def stop(self, session, timeout=5.0):
+        self._halt(session)
+        # Wait for an in-flight action of this account to finish
+        if session.lock.acquire(timeout=timeout):
+            session.lock.release()
+        else:
+            logger.warning(f"[{session.account_id}] Anonymizer action did not finish within timeout.")
+        session.stats.add_log("Anonymizer stopped", 'system')
+        logger.info("[%s] Anonymizer stopped.", session.account_id)
+
+    def queue_depths(self):
+        depths = {
+            ('scheduler',): len(self.scheduler),
+            ('executor',): self.executor._work_queue.qsize(),
+            ('search_executor',): self.search_executor._work_queue.qsize(),
+            ('prefetch_executor',): self.prefetch_executor._work_queue.qsize(),
+            ('track_pool',): sum(
+                len(s.anonymizer.track_pool) for s in self.sessions.values()
+                if s.anonymizer and s.anonymizer.track_pool
+            ),
+        }
+        if self.event_store:
+            depths[('event_store',)] = self.event_store.queue_depth()
+        return depths
+
+    def session_counts(self):
+        running = len(self.running_sessions())
+        authorized = sum(1 for s in self.sessions.values() if s.client.is_authorized())
+        return {
+            ('total',): len(self.sessions),
+            ('authorized',): authorized,
+            ('running',): running,
+        }
+
+    def running_sessions(self):
+        return [s for s in self.sessions.values() if s.is_running]
+
+    def shutdown(self, timeout=3.0):
+        for session in self.running_sessions():
+            self._halt(session)
+        self.scheduler.stop()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.search_executor.shutdown(wait=False, cancel_futures=True)
+        self.prefetch_executor.shutdown(wait=False, cancel_futures=True)
+        if self._scheduler_thread and self._scheduler_thread.is_alive():
+            self._scheduler_thread.join(timeout=timeout)
+        if self.event_store:
+            self.event_store.close(timeout=timeout)
@@ -0,0 +1,167 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+import logging
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY,
+        account TEXT NOT NULL,
+        ts REAL NOT NULL,
+        action_type TEXT NOT NULL,
+        message TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_events_account_ts ON events (account, ts)",
+    # Running per-account counters kept by the writer, so restoring totals never scans events
+    """CREATE TABLE IF NOT EXISTS totals (
+        account TEXT NOT NULL,
+        action_type TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (account, action_type)
+    )""",
+)
+
+_STOP = object()
+
+
+class EventStore:
+    def __init__(self, path, batch_size=500, flush_interval=1.0, max_queue=100000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            has_totals = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'totals'"
+            ).fetchone()
+            for statement in SCHEMA:
+                conn.execute(statement)
+            if not has_totals:
+                # One-off backfill for databases created before the totals table existed
+                conn.execute(
+                    "INSERT INTO totals (account, action_type, count) "
+                    "SELECT account, action_type, COUNT(*) FROM events GROUP BY account, action_type"
+                )
+            conn.commit()
+        finally:
+            conn.close()
+
+        self._writer = threading.Thread(target=self._run, name="spotifuck-event-writer", daemon=True)
+        self._writer.start()
+        logger.info("Event store opened at %s", self.path)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def append(self, account_id, ts, action_type, message):
+        try:
+            self._queue.put_nowait((account_id, ts, action_type, message))
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning("Event store queue full, %d events dropped so far", self.dropped)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        conn = self._connect()
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            while True:
+                if item is _STOP:
+                    running = False
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                counts = Counter((account_id, action_type) for account_id, _, action_type, _ in batch)
+                try:
+                    with conn:
+                        conn.executemany(
+                            "INSERT INTO events (account, ts, action_type, message) VALUES (?, ?, ?, ?)",
+                            batch,
+                        )
+                        conn.executemany(
+                            "INSERT INTO totals (account, action_type, count) VALUES (?, ?, ?) "
+                            "ON CONFLICT (account, action_type) DO UPDATE SET count = count + excluded.count",
+                            [(account_id, action_type, count) for (account_id, action_type), count in counts.items()],
+                        )
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to write {len(batch)} events to {self.path}: {e}")
+        conn.close()
+
+    def close(self, timeout=5.0):
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join(timeout=timeout)
+
+    def _query(self, sql, params):
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def query_events(self, account_id, since=None, until=None, action_type=None, limit=100):
+        sql = "SELECT ts, action_type, message FROM events WHERE account = ? AND ts >= ? AND ts < ?"
+        params = [account_id, since or 0, until or time.time() + 1]
+        if action_type:
+            sql += " AND action_type = ?"
+            params.append(action_type)
+        sql += " ORDER BY ts DESC LIMIT ?"
+        params.append(limit)
+        return [
+            {'ts': ts, 'action_type': action_type, 'message': message}
+            for ts, action_type, message in self._query(sql, params)
+        ]
+
+    def counts(self, account_id, since, until=None, bucket_seconds=3600):
+        rows = self._query(
+            "SELECT CAST(ts / ? AS INTEGER) AS bucket, action_type, COUNT(*) FROM events "
+            "WHERE account = ? AND ts >= ? AND ts < ? GROUP BY bucket, action_type ORDER BY bucket",
+            [bucket_seconds, account_id, since, until or time.time() + 1],
+        )
+        buckets = {}
+        for bucket, action_type, count in rows:
+            buckets.setdefault(bucket * bucket_seconds, {})[action_type] = count
+        return [{'start': start, 'counts': counts} for start, counts in buckets.items()]
+
+    def totals(self, account_id):
+        rows = self._query(
+            "SELECT action_type, count FROM totals WHERE account = ?",
+            [account_id],
+        )
+        return dict(rows)
+
+
+def open_event_store(path=None):
+    path = os.environ.get("SPOTIFUCK_DB", "spotifuck.db") if path is None else path
+    if not path:
+        return None
+    try:
+        return EventStore(path)
+    except sqlite3.Error as e:
+        logger.error(f"Could not open event store {path}: {e}")
+        return None
@@ -0,0 +1,66 @@
+import os
+import threading
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_BASE = "https://api.spotify.com/v1"
+DEFAULT_ACCOUNTS_BASE = "https://accounts.spotify.com"
+
+
+class HttpTransport:
+    def __init__(self, pool_connections=None, pool_maxsize=None, timeout=10,
+                 api_base=None, accounts_base=None):
+        # pool_connections = number of per-host pools kept, pool_maxsize = keep-alive sockets per host
+        self.pool_connections = pool_connections or int(
+            os.environ.get("SPOTIFY_POOL_CONNECTIONS", "4")
+        )
+        self.pool_maxsize = pool_maxsize or int(
+            os.environ.get("SPOTIFY_POOL_MAXSIZE", "16")
+        )
+        self.timeout = timeout
+        # Overridable so the client can be pointed at a local HTTP stand-in
+        self.api_base = (
+            api_base or os.environ.get("SPOTIFY_API_BASE", DEFAULT_API_BASE)
+        ).rstrip("/")
+        self.accounts_base = (
+            accounts_base or os.environ.get("SPOTIFY_ACCOUNTS_BASE", DEFAULT_ACCOUNTS_BASE)
+        ).rstrip("/")
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        logger.info("HTTP transport initialized (pools=%d, connections/host=%d, api=%s)",
+                    self.pool_connections, self.pool_maxsize, self.api_base)
+
+    def api_url(self, path):
+        return f"{self.api_base}/{path.lstrip('/')}"
+
+    def accounts_url(self, path):
+        return f"{self.accounts_base}/{path.lstrip('/')}"
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_shared_transport = None
+_shared_transport_lock = threading.Lock()
+
+
+def get_shared_transport():
+    global _shared_transport
+    with _shared_transport_lock:
+        if _shared_transport is None:
+            _shared_transport = HttpTransport()
+        return _shared_transport
@@ -0,0 +1,90 @@
+import os
+import atexit
+import queue
+import threading
+import logging
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Loggers whose INFO/DEBUG output scales with the number of running accounts
+SAMPLED_LOGGERS = ('anonymizer', 'spotify_client', 'stats', 'track_pool', 'engine')
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+class SamplingFilter(logging.Filter):
+    # Passes the first and then every `rate`-th record per logging call site; warnings and
+    # errors always pass. Keying on the call site rather than the message keeps the counts
+    # bounded by the number of log statements, whatever the message formatting.
+    def __init__(self, rate, max_level=logging.INFO, loggers=SAMPLED_LOGGERS):
+        super().__init__()
+        self.rate = rate
+        self.max_level = max_level
+        self.loggers = tuple(loggers)
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.rate <= 1 or record.levelno > self.max_level:
+            return True
+        if self.loggers and not record.name.startswith(self.loggers):
+            return True
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % self.rate == 0
+
+
+class DeferredQueueHandler(QueueHandler):
+    def prepare(self, record):
+        # Same process, so the record can be handed over as is and formatted by the listener thread.
+        # Arguments are therefore rendered a little later; callers must not mutate them after logging.
+        return record
+
+
+def setup_logging(level=None, async_logging=None, sample_rate=None, stream=None):
+    # Replaces any handlers already on the root logger, so it is safe to call more than once
+    global _listener
+    level = level or os.environ.get("SPOTIFUCK_LOG_LEVEL", "INFO")
+    if async_logging is None:
+        async_logging = os.environ.get("SPOTIFUCK_LOG_ASYNC", "1") == "1"
+    if sample_rate is None:
+        sample_rate = int(os.environ.get("SPOTIFUCK_LOG_SAMPLE", "1"))
+
+    with _setup_lock:
+        root = logging.getLogger()
+        root.setLevel(level)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+        output = logging.StreamHandler(stream)
+        output.setFormatter(logging.Formatter(LOG_FORMAT))
+        if async_logging:
+            log_queue = queue.SimpleQueue()
+            handler = DeferredQueueHandler(log_queue)
+            _listener = QueueListener(log_queue, output, respect_handler_level=True)
+            _listener.start()
+        else:
+            handler = output
+        if sample_rate > 1:
+            handler.addFilter(SamplingFilter(sample_rate))
+        root.addHandler(handler)
+    return _listener
+
+
+def stop_logging():
+    # Flushes records still queued for the listener thread
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,151 @@
+import threading
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labelnames, labels, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labels)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+            for labels, value in values
+        ]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set_function(self, function):
+        # function() returns {labels_tuple: value}; evaluated only at scrape time
+        self._function = function
+
+    def render(self):
+        lines = self.header()
+        if self._function is None:
+            return lines
+        try:
+            values = self._function()
+        except Exception:
+            return lines
+        return lines + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+            for labels, value in values.items()
+        ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+        lines = self.header()
+        for labels, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), values[:-1]):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {values[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+SPOTIFY_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "spotify_request_duration_seconds", "Latency of Spotify API requests by client method.",
+    ("endpoint",),
+))
+SPOTIFY_REQUESTS = REGISTRY.register(Counter(
+    "spotify_requests_total", "Spotify API responses by client method and HTTP status.",
+    ("endpoint", "status"),
+))
+TOKEN_REFRESHES = REGISTRY.register(Counter(
+    "spotify_token_refreshes_total", "Access token refresh attempts by result.", ("result",),
+))
+JOB_SECONDS = REGISTRY.register(Histogram(
+    "spotifuck_job_duration_seconds", "Duration of each scheduled anonymizer job iteration.",
+    ("action",),
+))
+SONG_SWITCH_SECONDS = REGISTRY.register(Histogram(
+    "spotifuck_song_switch_seconds", "Time taken to start the next song or context.",
+))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "spotifuck_queue_depth", "Pending items per internal queue.", ("queue",),
+))
+SESSIONS = REGISTRY.register(Gauge(
+    "spotifuck_sessions", "Account sessions by state.", ("state",),
+))
+RATE_LIMIT = REGISTRY.register(Gauge(
+    "spotify_rate_limit_requests_per_second", "Current adaptive request rate of the shared limiter.",
+))
@@ -0,0 +1,166 @@
+import os
+import random
+import threading
+import time
+import logging
+
+import requests
+
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+REFRESH_RETRY_DELAY = 60
+
+
+def _playlist_items(payload):
+    # Search results can contain nulls in place of removed playlists
+    items = ((payload or {}).get('playlists') or {}).get('items') or []
+    return [
+        {'uri': item['uri'], 'name': item.get('name', '')}
+        for item in items
+        if item and item.get('uri')
+    ]
+
+
+def _category_ids(payload):
+    items = ((payload or {}).get('categories') or {}).get('items') or []
+    return [item['id'] for item in items if item and item.get('id')]
+
+
+class PlaylistCatalogue:
+    def __init__(self, spotify_client, search_words=None, ttl=None, max_playlists=1000,
+                 featured_pages=4, categories_per_refresh=4, searches_per_refresh=4,
+                 page_size=50, executor=None, rng=None):
+        self.spotify_client = spotify_client
+        # Playlist search terms; sampled with our own rng so refreshes never draw from the
+        # anonymizer's random streams or planner
+        self.search_words = search_words or []
+        self.rng = rng or random.Random()
+        self.ttl = ttl if ttl is not None else float(os.environ.get("SPOTIFY_CATALOGUE_TTL", "3600"))
+        self.max_playlists = max_playlists
+        self.featured_pages = featured_pages
+        self.categories_per_refresh = categories_per_refresh
+        self.searches_per_refresh = searches_per_refresh
+        self.page_size = page_size
+        self.executor = executor
+        self._sources = {}  # source key -> {'items', 'fetched_at'}
+        self._playlists = []
+        self._refreshed_at = 0
+        self._lock = threading.Lock()
+        # Bumped by clear(); a refresh that started before it must not publish its results
+        self._generation = 0
+        self._refresh_task = SingleFlight(self.refresh, "playlist catalogue refresh")
+
+    def __len__(self):
+        return len(self._playlists)
+
+    def clear(self):
+        # Forget everything, e.g. when the client is authorized as another user
+        with self._lock:
+            self._generation += 1
+            self._sources = {}
+            self._playlists = []
+            self._refreshed_at = 0
+
+    def requests_per_refresh(self):
+        # Upper bound: featured pages stop early once a short page comes back
+        searches = self.searches_per_refresh if self.search_words else 0
+        return self.featured_pages + 1 + self.categories_per_refresh + searches
+
+    def sample(self):
+        # Never blocks on the network: stale or empty catalogues are refreshed in the background
+        playlists = self._playlists
+        if not playlists or time.time() - self._refreshed_at > self.ttl:
+            self.request_refresh()
+        return self.rng.choice(playlists) if playlists else None
+
+    def request_refresh(self):
+        self._refresh_task.request(self.executor)
+
+    def _fetch(self, sources, key, endpoint, path, params, now, extract=_playlist_items):
+        cached = sources.get(key)
+        try:
+            # Revalidated through the client's response cache; 304 means the payload is unchanged
+            status, payload = self.spotify_client.fetch_json(endpoint, path, params)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning(f"Catalogue source {key} failed: {str(e)}")
+            return None
+        if status == 304 and cached:
+            cached['fetched_at'] = now
+            return cached
+        source = {'items': extract(payload), 'fetched_at': now}
+        sources[key] = source
+        return source
+
+    def _random_query(self):
+        words = self.search_words
+        if not words:
+            return ""
+        return ' '.join(self.rng.sample(words, min(self.rng.randint(1, 2), len(words))))
+
+    def refresh(self):
+        # Works on a copy of the sources and publishes it in one step under the lock
+        with self._lock:
+            generation = self._generation
+            sources = dict(self._sources)
+        try:
+            now = time.time()
+            fetched = []
+            for page in range(self.featured_pages):
+                params = {'limit': self.page_size, 'offset': page * self.page_size}
+                source = self._fetch(sources, f"featured:{page}", "featured_playlists",
+                                     "browse/featured-playlists", params, now)
+                fetched.append(source)
+                if source is None or len(source['items']) < self.page_size:
+                    break
+
+            categories = self._fetch(sources, "categories", "categories", "browse/categories",
+                                     {'limit': self.page_size}, now, extract=_category_ids)
+            category_ids = categories['items'] if categories else []
+            for category_id in self.rng.sample(category_ids, min(self.categories_per_refresh, len(category_ids))):
+                fetched.append(self._fetch(sources, f"category:{category_id}", "category_playlists",
+                                           f"browse/categories/{category_id}/playlists",
+                                           {'limit': self.page_size}, now))
+
+            if self.search_words:
+                for _ in range(self.searches_per_refresh):
+                    query = self._random_query()
+                    if query:
+                        fetched.append(self._fetch(sources, f"search:{query}", "search", "search",
+                                                   {'q': query, 'type': 'playlist', 'limit': self.page_size}, now))
+
+            if any(fetched):
+                self._rebuild(generation, sources, now)
+            else:
+                # Keep serving what we have and try again shortly
+                logger.warning("Playlist catalogue refresh failed, retrying in %d s", REFRESH_RETRY_DELAY)
+                with self._lock:
+                    if generation == self._generation:
+                        self._refreshed_at = now - self.ttl + REFRESH_RETRY_DELAY
+        except Exception as e:
+            logger.error(f"Error refreshing playlist catalogue: {str(e)}", exc_info=True)
+
+    def _rebuild(self, generation, sources, now):
+        # Sources not seen in this refresh or the previous TTL window are forgotten
+        sources = {
+            key: source for key, source in sources.items()
+            if now - source['fetched_at'] <= self.ttl
+        }
+        playlists = {}
+        for key, source in sources.items():
+            if key == "categories":
+                continue
+            for item in source['items']:
+                playlists.setdefault(item['uri'], item)
+        playlists = list(playlists.values())
+        if len(playlists) > self.max_playlists:
+            playlists = self.rng.sample(playlists, self.max_playlists)
+        with self._lock:
+            if generation != self._generation:
+                logger.info("Dropping a playlist catalogue refresh that started before it was cleared")
+                return
+            self._sources = sources
+            self._playlists = playlists
+            self._refreshed_at = now
+        logger.info("Playlist catalogue refreshed: %d playlists from %d sources", len(playlists), len(sources))
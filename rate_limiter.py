@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+import logging
+from email.utils import parsedate_to_datetime
+
+logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(value, default=1.0):
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class RateLimiter:
+    def __init__(self, rate=None, burst=None, min_rate=None, recovery_step=None):
+        # rate is requests/second; it is halved on every 429 and crawls back up on success
+        self.max_rate = rate or float(os.environ.get("SPOTIFY_RATE_LIMIT", "10"))
+        self.burst = burst or float(os.environ.get("SPOTIFY_RATE_BURST", "20"))
+        self.min_rate = min_rate or self.max_rate / 20
+        self.recovery_step = recovery_step or self.max_rate / 100
+        self.rate = self.max_rate
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+        self.throttled_count = 0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return True
+                    wait = (1 - self.tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def on_success(self):
+        if self.rate < self.max_rate:
+            with self.lock:
+                self.rate = min(self.max_rate, self.rate + self.recovery_step)
+
+    def on_throttled(self, retry_after):
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0
+            self.throttled_count += 1
+            rate = self.rate
+        logger.warning("Rate limited by Spotify: pausing %.1f s, rate lowered to %.2f req/s",
+                       retry_after, rate)
+
+    def status(self):
+        with self.lock:
+            return {
+                'rate': round(self.rate, 3),
+                'max_rate': self.max_rate,
+                'throttled': self.throttled_count,
+                'blocked_for': round(max(0.0, self.blocked_until - time.monotonic()), 3),
+            }
+
+
+_shared_rate_limiter = None
+_shared_rate_limiter_lock = threading.Lock()
+
+
+def get_shared_rate_limiter():
+    global _shared_rate_limiter
+    with _shared_rate_limiter_lock:
+        if _shared_rate_limiter is None:
+            _shared_rate_limiter = RateLimiter()
+        return _shared_rate_limiter
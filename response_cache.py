@@ -0,0 +1,103 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+
+def estimate_size(payload):
+    # Approximate memory held by a parsed JSON payload (containers, keys and values). Strings
+    # shared between entries are counted each time, so this errs on the high side.
+    size = 0
+    stack = [payload]
+    while stack:
+        value = stack.pop()
+        size += sys.getsizeof(value)
+        if isinstance(value, dict):
+            stack.extend(value.keys())
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return size
+
+
+class ResponseCache:
+    # ETag + parsed body per GET url, least recently used first out. Bounded both by entry count
+    # and by the estimated in-memory size of the parsed payloads (several times the size of the
+    # JSON body). Payloads are handed out as is on a 304, so callers must treat them as read-only.
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries if max_entries is not None else int(
+            os.environ.get("SPOTIFY_RESPONSE_CACHE_SIZE", "256")
+        )
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.environ.get("SPOTIFY_RESPONSE_CACHE_BYTES", str(4 * 1024 * 1024))
+        )
+        self._entries = OrderedDict()  # key -> (etag, payload, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(url, params=None):
+        return (url, tuple(sorted((params or {}).items())))
+
+    def get(self, key):
+        # Returns (etag, payload) or None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def put(self, key, etag, payload, size=None):
+        if not self.enabled:
+            return
+        if size is None:
+            size = estimate_size(payload)
+        if size > self.max_bytes:
+            self.discard(key)
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (etag, payload, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[2]
+
+    def discard(self, key):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def status(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
@@ -0,0 +1,72 @@
+import heapq
+import itertools
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineScheduler:
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._heap = []
+        self._live = {}  # key -> sequence number of its current heap entry
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+
+    def schedule(self, key, due, callback):
+        with self._cond:
+            seq = next(self._counter)
+            self._live[key] = seq
+            heapq.heappush(self._heap, (due, seq, key, callback))
+            if self._heap[0][1] == seq:
+                self._cond.notify()
+
+    def cancel(self, key):
+        with self._cond:
+            self._live.pop(key, None)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    @property
+    def stopped(self):
+        return self._stopped
+
+    def __len__(self):
+        return len(self._live)
+
+    def _next_entry(self):
+        # Superseded and cancelled entries are dropped lazily when they reach the top
+        while self._heap:
+            due, seq, key, callback = self._heap[0]
+            if self._live.get(key) == seq:
+                return self._heap[0]
+            heapq.heappop(self._heap)
+        return None
+
+    def run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopped:
+                        return
+                    entry = self._next_entry()
+                    if entry is None:
+                        self._cond.wait()
+                        continue
+                    delay = entry[0] - self.clock()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                due, seq, key, callback = heapq.heappop(self._heap)
+                del self._live[key]
+
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Scheduled action {key!r} failed: {str(e)}", exc_info=True)
@@ -0,0 +1,223 @@
+import sys
+import json
+import heapq
+import random
+import argparse
+import logging
+from collections import Counter, deque
+
+# Replays the Anonymizer policy on a virtual clock against an in-memory client, so a config
+# change can be sized (API calls/hour, full-play ratio, peak search rate) before it ships.
+from anonymizer import Anonymizer
+from circuit_breaker import backoff_delay
+
+# Engine._retry_time policy; engine.py is not imported so the simulator stays free of the HTTP stack
+PLAYBACK_RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 300
+
+SIM_WORDS = ["music", "pop", "rock", "jazz", "chill", "party", "focus", "80s", "90s", "indie",
+             "dance", "rap", "study", "sleep", "workout", "country", "classical", "viral"]
+
+
+class VirtualClock:
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+class SimStats:
+    def __init__(self):
+        self.events = Counter()
+
+    def add_log(self, message, action_type):
+        self.events[action_type] += 1
+
+
+class SimClient:
+    # Stands in for SpotifyClient: counts calls and models one device's play position
+    def __init__(self, clock, rng, track_duration_range=(120, 300), tracks_per_search=20):
+        self.clock = clock
+        self.rng = rng
+        self.track_duration_range = track_duration_range
+        self.tracks_per_search = tracks_per_search
+        self.calls = Counter()
+        self.search_minutes = Counter()
+        self._durations = {}
+        self._track_id = 0
+        self._playing = None  # (uri, started_at)
+        self._upcoming = deque()
+        self._context = None  # playlist uri while a context stream is playing
+
+    def _track(self):
+        self._track_id += 1
+        uri = f"spotify:track:sim{self._track_id}"
+        duration_ms = int(self.rng.uniform(*self.track_duration_range) * 1000)
+        self._durations[uri] = duration_ms
+        return {"uri": uri, "name": f"Sim Track {self._track_id}", "duration_ms": duration_ms,
+                "artists": [{"name": "Sim Artist"}]}
+
+    def _next_uri(self):
+        # Queued tracks first, then the rest of the play call or the context's next track
+        if self._upcoming:
+            return self._upcoming.popleft()
+        if self._context:
+            return self._track()["uri"]
+        return None
+
+    def _advance(self):
+        now = self.clock()
+        while self._playing:
+            uri, started_at = self._playing
+            end = started_at + self._durations.get(uri, 0) / 1000
+            if now < end:
+                return
+            next_uri = self._next_uri()
+            self._playing = (next_uri, end) if next_uri else None
+
+    def search(self, query, type="track", limit=20):
+        self.calls["search"] += 1
+        self.search_minutes[int(self.clock() // 60)] += 1
+        return {"tracks": {"items": [self._track() for _ in range(self.tracks_per_search)]}}
+
+    def start_stream(self, context_uri=None):
+        self.calls["featured_playlists"] += 1
+        self.calls["start_stream"] += 1
+        # The playlist plays generated tracks back to back, like a real context
+        self._context = f"spotify:playlist:sim{self.rng.randint(1, 50)}"
+        self._upcoming.clear()
+        self._playing = (self._track()["uri"], self.clock())
+        return self._context
+
+    def play_song(self, uri):
+        self.calls["play_song"] += 1
+        self._context = None
+        uris = [uri] if isinstance(uri, str) else list(uri)
+        self._playing = (uris[0], self.clock())
+        self._upcoming = deque(uris[1:])
+        return True
+
+    def add_to_queue(self, uri):
+        self.calls["add_to_queue"] += 1
+        self._advance()
+        self._upcoming.appendleft(uri)
+        return True
+
+    def next_track(self):
+        self.calls["next_track"] += 1
+        self._advance()
+        next_uri = self._next_uri()
+        self._playing = (next_uri, self.clock()) if next_uri else None
+        return True
+
+    def get_playback_state(self):
+        self.calls["get_playback_state"] += 1
+        self._advance()
+        if not self._playing:
+            return {"is_playing": False}
+        uri, started_at = self._playing
+        return {
+            "is_playing": True,
+            "progress_ms": int((self.clock() - started_at) * 1000),
+            "item": {"uri": uri, "duration_ms": self._durations[uri]},
+            "context": {"uri": self._context} if self._context else None,
+        }
+
+
+def simulate(hours=24.0, seed=None, configure=None, track_duration_range=(120, 300)):
+    clock = VirtualClock()
+    rng = random.Random(seed)
+    client = SimClient(clock, rng, track_duration_range)
+    stats = SimStats()
+    anonymizer = Anonymizer(clock=clock, rng=rng, search_words=SIM_WORDS)
+    anonymizer.use_track_pool = False
+    if configure:
+        configure(anonymizer)
+
+    end = hours * 3600
+    anonymizer.start_immediate_playback(client, stats)
+    # Same two deadline streams the engine schedules: playback switches and background searches
+    events = [(anonymizer.next_change_time(), 0, "playback"), (anonymizer.next_search_deadline(), 1, "search")]
+    background_searches = 0
+    failures = 0
+    while events:
+        due, order, kind = heapq.heappop(events)
+        if due >= end:
+            break
+        clock.now = max(clock.now, due)
+        if kind == "playback":
+            if anonymizer.ensure_continuous_playback(client, stats):
+                failures = 0
+                due = anonymizer.next_change_time()
+            else:
+                failures += 1
+                due = clock.now + backoff_delay(failures - 1, PLAYBACK_RETRY_DELAY, MAX_RETRY_DELAY, rng)
+        else:
+            if anonymizer.reserve_search():
+                client.search(anonymizer.get_random_search())
+                background_searches += 1
+            due = anonymizer.next_search_deadline()
+        # Never schedule in the past, otherwise a stuck deadline would spin without advancing time
+        heapq.heappush(events, (max(due, clock.now + 0.001), order, kind))
+
+    total_calls = sum(client.calls.values())
+    songs = stats.events["stream"]
+    return {
+        "hours": hours,
+        "api_calls": total_calls,
+        "api_calls_per_hour": round(total_calls / hours, 1),
+        "calls_per_hour": {name: round(count / hours, 1) for name, count in sorted(client.calls.items())},
+        "songs_started": songs,
+        "full_plays": stats.events["play"],
+        "full_play_ratio": round(stats.events["play"] / songs, 3) if songs else 0.0,
+        "background_searches": background_searches,
+        "peak_searches_per_minute": max(client.search_minutes.values(), default=0),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay the anonymizer policy on a virtual clock")
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--accounts", type=int, default=1, help="scale the totals to this many accounts")
+    parser.add_argument("--min-duration", type=float, nargs=2, metavar=("MIN", "MAX"))
+    parser.add_argument("--full-song-chance", type=float)
+    parser.add_argument("--max-searches", type=int, help="max_searches_per_minute")
+    parser.add_argument("--search-delay", type=float, nargs=2, metavar=("MIN", "MAX"))
+    parser.add_argument("--track-duration", type=float, nargs=2, default=(120, 300), metavar=("MIN", "MAX"),
+                        help="simulated track length range, seconds")
+    parser.add_argument("--playback-state", action="store_true")
+    parser.add_argument("--gapless", action="store_true")
+    parser.add_argument("--batch-size", type=int)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    def configure(anonymizer):
+        if args.min_duration:
+            anonymizer.min_song_duration_range = tuple(args.min_duration)
+        if args.full_song_chance is not None:
+            anonymizer.full_song_chance = args.full_song_chance
+        if args.max_searches:
+            anonymizer.max_searches_per_minute = args.max_searches
+        if args.search_delay:
+            anonymizer.search_delay_range = tuple(args.search_delay)
+        anonymizer.playback_state_mode = args.playback_state or anonymizer.playback_state_mode
+        anonymizer.gapless_mode = args.gapless or anonymizer.gapless_mode
+        if args.batch_size:
+            anonymizer.batch_size = args.batch_size
+
+    report = simulate(args.hours, args.seed, configure, tuple(args.track_duration))
+    if args.accounts > 1:
+        report["fleet"] = {
+            "accounts": args.accounts,
+            "api_calls_per_hour": round(report["api_calls_per_hour"] * args.accounts, 1),
+            "api_calls_per_second": round(report["api_calls_per_hour"] * args.accounts / 3600, 2),
+        }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
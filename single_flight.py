@@ -0,0 +1,53 @@
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    # Runs target in the background with at most one run pending or in progress; requests made
+    # meanwhile are dropped. Runs on the given executor, or on a daemon thread when there is none.
+    def __init__(self, target, name):
+        self.target = target
+        self.name = name
+        self._lock = threading.Lock()
+        self._busy = False
+
+    @property
+    def busy(self):
+        return self._busy
+
+    def request(self, executor=None):
+        # Returns True when a run was started
+        with self._lock:
+            if self._busy:
+                return False
+            self._busy = True
+        try:
+            if executor is not None:
+                executor.submit(self._run).add_done_callback(self._cancelled)
+            else:
+                threading.Thread(target=self._run, name=self.name, daemon=True).start()
+        except RuntimeError as e:
+            # e.g. the executor was shut down; leave the next request free to try again
+            logger.warning("Could not schedule %s: %s", self.name, e)
+            self._release()
+            return False
+        return True
+
+    def _run(self):
+        try:
+            self.target()
+        except Exception as e:
+            logger.error("Error in %s: %s", self.name, e, exc_info=True)
+        finally:
+            self._release()
+
+    def _cancelled(self, future):
+        # A run dropped by executor.shutdown(cancel_futures=True) never reaches its finally
+        if future.cancelled():
+            self._release()
+
+    def _release(self):
+        with self._lock:
+            self._busy = False
@@ -6,12 +6,24 @@ import time
 from urllib.parse import urlencode
 import random
 import logging
+import threading
+
+from http_transport import get_shared_transport
+from rate_limiter import get_shared_rate_limiter, parse_retry_after
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from response_cache import ResponseCache
+from single_flight import SingleFlight
+from metrics import SPOTIFY_REQUEST_SECONDS, SPOTIFY_REQUESTS, TOKEN_REFRESHES
 
 logger = logging.getLogger(__name__)
 
 
+class RateLimitTimeout(requests.exceptions.RequestException):
+    pass
+
+
 class SpotifyClient:
-    def __init__(self):
+    def __init__(self, transport=None, token_file="token_info.json", rate_limiter=None):
         self.client_id = os.environ.get(
             "SPOTIFY_CLIENT_ID", ""
         )
@@ -21,8 +33,25 @@ class SpotifyClient:
         self.redirect_uri = os.environ.get(
             "SPOTIFY_REDIRECT_URI", "http://127.0.0.1:6969/callback"
         )
+        self.transport = transport or get_shared_transport()
+        self.rate_limiter = rate_limiter or get_shared_rate_limiter()
+        self.rate_limit_timeout = 30
+        self.max_429_retries = 2
+        self.max_retry_after_wait = 10
+        self.breakers = {}  # endpoint -> CircuitBreaker
+        self._breakers_lock = threading.Lock()
+        self.device_cache_ttl = float(os.environ.get("SPOTIFY_DEVICE_CACHE_TTL", "30"))
+        self._device_cache = None
+        self._device_cache_time = 0
+        self._device_lock = threading.Lock()
+        self._device_refresh = SingleFlight(self._fetch_active_device, "device cache refresh")
+        self.response_cache = ResponseCache()  # ETag + parsed body of read endpoints, per account
+        self.catalogue = None  # optional PlaylistCatalogue sampled by start_stream
         self.token_info = None
-        self.token_file = "token_info.json"
+        self.token_file = token_file
+        self.refresh_lead = 300  # seconds before expiry at which the background refresh runs
+        self._refresh_lock = threading.Lock()
+        self._background_refresh = SingleFlight(self.refresh_token, "token refresh")
         self.load_token()
 
     def load_token(self):
@@ -30,20 +59,16 @@ class SpotifyClient:
             if os.path.exists(self.token_file):
                 with open(self.token_file, "r") as f:
                     self.token_info = json.load(f)
-                    logger.info(f"Loaded token info from {self.token_file}")
+                    logger.info("Loaded token info from %s", self.token_file)
 
+                # Refreshing is left to the background refresher or the first request
                 if (
                     self.token_info
                     and self.token_info.get("expires_at", 0) < (time.time() + 60)
                 ):
                     logger.info(
-                        "Token expired or nearing expiration, attempting refresh."
+                        "Token expired or nearing expiration, it will be refreshed on first use."
                     )
-                    if not self.refresh_token():
-                        logger.warning(
-                            "Token refresh failed during load. Authorization may be lost."
-                        )
-                        self.token_info = None
                 elif not self.token_info:
                     logger.warning(
                         f"Token file {self.token_file} contained invalid data."
@@ -56,7 +81,7 @@ class SpotifyClient:
                 try:
                     os.remove(self.token_file)
                     logger.info(
-                        f"Removed potentially corrupted token file: {self.token_file}"
+                        "Removed potentially corrupted token file: %s", self.token_file
                     )
                 except OSError as del_e:
                     logger.error(f"Failed to remove corrupted token file: {del_e}")
@@ -64,9 +89,16 @@ class SpotifyClient:
     def save_token(self):
         if self.token_info:
             try:
-                with open(self.token_file, "w") as f:
+                token_dir = os.path.dirname(self.token_file)
+                if token_dir:
+                    os.makedirs(token_dir, exist_ok=True)
+                tmp_file = f"{self.token_file}.tmp"
+                with open(tmp_file, "w") as f:
                     json.dump(self.token_info, f, indent=4)
-                logger.info(f"Saved token info to {self.token_file}")
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, self.token_file)
+                logger.info("Saved token info to %s", self.token_file)
             except IOError as e:
                 logger.error(f"Error saving token to {self.token_file}: {str(e)}")
         else:
@@ -79,7 +111,7 @@ class SpotifyClient:
             and self.token_info.get("expires_at", 0) > time.time()
         )
 
-    def get_auth_url(self):
+    def get_auth_url(self, state=None):
         scopes = [
             "user-read-private",
             "user-read-email",
@@ -95,8 +127,10 @@ class SpotifyClient:
             "redirect_uri": self.redirect_uri,
             "scope": " ".join(scopes),
         }
+        if state:
+            params["state"] = state
         auth_url = f"https://accounts.spotify.com/authorize?{urlencode(params)}"
-        logger.info(f"Generated authorization URL: {auth_url}")
+        logger.info("Generated authorization URL: %s", auth_url)
         return auth_url
 
     def get_token(self, code):
@@ -116,11 +150,12 @@ class SpotifyClient:
             }
 
             logger.info("Requesting token with authorization code...")
-            response = requests.post(
-                "https://accounts.spotify.com/api/token",
+            response = self._request(
+                "get_token",
+                "POST",
+                self.transport.accounts_url("api/token"),
                 headers=headers,
                 data=data,
-                timeout=10,
             )
             response.raise_for_status()
 
@@ -134,6 +169,11 @@ class SpotifyClient:
             )
             self.token_info = token_info
             self.save_token()
+            # The new token may belong to another user
+            self.response_cache.clear()
+            self.invalidate_device_cache()
+            if self.catalogue is not None:
+                self.catalogue.clear()
             logger.info("Successfully obtained and saved new token.")
             return True
 
@@ -149,7 +189,37 @@ class SpotifyClient:
             self.token_info = None
             return False
 
+    def next_refresh_time(self):
+        token_info = self.token_info
+        if not token_info or "refresh_token" not in token_info:
+            return None
+        return token_info.get("expires_at", 0) - self.refresh_lead
+
     def refresh_token(self):
+        # Single-flight: callers that queue behind a running refresh reuse its result
+        expires_at = (self.token_info or {}).get("expires_at")
+        with self._refresh_lock:
+            token_info = self.token_info
+            if (
+                token_info
+                and token_info.get("expires_at") != expires_at
+                and self.is_authorized()
+            ):
+                logger.debug("Token was refreshed by a concurrent caller.")
+                return True
+            return self._refresh_token()
+
+    def refresh_token_async(self):
+        if self._refresh_lock.locked():
+            return
+        self._background_refresh.request()
+
+    def _refresh_token(self):
+        result = self._do_refresh_token()
+        TOKEN_REFRESHES.inc("success" if result else "failure")
+        return result
+
+    def _do_refresh_token(self):
         if not self.token_info or "refresh_token" not in self.token_info:
             logger.error("Cannot refresh token: No token info or refresh token available.")
             return False
@@ -169,11 +239,12 @@ class SpotifyClient:
             }
 
             logger.info("Attempting to refresh token...")
-            response = requests.post(
-                "https://accounts.spotify.com/api/token",
+            response = self._request(
+                "refresh_token",
+                "POST",
+                self.transport.accounts_url("api/token"),
                 headers=headers,
                 data=data,
-                timeout=10,
             )
             response.raise_for_status()
 
@@ -205,7 +276,7 @@ class SpotifyClient:
                     if os.path.exists(self.token_file):
                         try:
                             os.remove(self.token_file)
-                            logger.info(f"Removed invalid token file: {self.token_file}")
+                            logger.info("Removed invalid token file: %s", self.token_file)
                         except OSError as del_e:
                             logger.error(f"Failed to remove invalid token file: {del_e}")
 
@@ -215,29 +286,136 @@ class SpotifyClient:
             return False
 
     def _get_auth_header(self):
-        if not self.token_info or not self.token_info.get("access_token"):
+        token_info = self.token_info
+        if not token_info or not token_info.get("access_token"):
             logger.warning("_get_auth_header: No access token available.")
             return None
 
-        if self.token_info.get("expires_at", 0) < (time.time() + 60):
+        expires_at = token_info.get("expires_at", 0)
+        if expires_at < (time.time() + 5):
             logger.info(
-                "_get_auth_header: Token expired or nearing expiration, attempting refresh."
+                "_get_auth_header: Token expired, refreshing before request."
             )
             if not self.refresh_token():
                 logger.error(
                     "_get_auth_header: Token refresh failed. Cannot provide auth header."
                 )
                 return None
+        elif expires_at < (time.time() + 60):
+            # Still usable; renew off the request path
+            self.refresh_token_async()
 
-        if not self.token_info or not self.token_info.get("access_token"):
+        token_info = self.token_info
+        if not token_info or not token_info.get("access_token"):
             logger.error("_get_auth_header: Still no access token after checking/refreshing.")
             return None
 
         return {
-            "Authorization": f"Bearer {self.token_info['access_token']}",
+            "Authorization": f"Bearer {token_info['access_token']}",
             "Content-Type": "application/json",
         }
 
+    def _breaker(self, endpoint):
+        with self._breakers_lock:
+            breaker = self.breakers.get(endpoint)
+            if breaker is None:
+                breaker = self.breakers[endpoint] = CircuitBreaker(endpoint)
+            return breaker
+
+    def breaker_status(self):
+        with self._breakers_lock:
+            breakers = list(self.breakers.items())
+        return {endpoint: breaker.status() for endpoint, breaker in sorted(breakers)}
+
+    def _request(self, endpoint, method, url, **kwargs):
+        # Network errors and 5xx count against the endpoint's breaker; 429s are the rate limiter's business
+        breaker = self._breaker(endpoint)
+        if not breaker.allow():
+            SPOTIFY_REQUESTS.inc(endpoint, "circuit_open")
+            raise CircuitOpenError(f"Circuit for {endpoint} is open, skipping {method} {url}")
+        try:
+            response = self._send(endpoint, method, url, **kwargs)
+        except RateLimitTimeout:
+            breaker.release()
+            raise
+        except requests.exceptions.RequestException:
+            breaker.on_failure()
+            raise
+        except Exception:
+            # Anything else must not leave a half-open probe outstanding forever
+            breaker.release()
+            raise
+        if response.status_code >= 500:
+            breaker.on_failure()
+        else:
+            breaker.on_success()
+        return response
+
+    def _send(self, endpoint, method, url, **kwargs):
+        for attempt in range(self.max_429_retries + 1):
+            if not self.rate_limiter.acquire(timeout=self.rate_limit_timeout):
+                SPOTIFY_REQUESTS.inc(endpoint, "rate_limited")
+                raise RateLimitTimeout(f"Timed out waiting for rate limiter before {method} {url}")
+            start = time.perf_counter()
+            try:
+                response = self.transport.request(method, url, **kwargs)
+            except requests.exceptions.RequestException:
+                SPOTIFY_REQUESTS.inc(endpoint, "error")
+                raise
+            finally:
+                SPOTIFY_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint)
+            SPOTIFY_REQUESTS.inc(endpoint, str(response.status_code))
+            if response.status_code != 429:
+                self.rate_limiter.on_success()
+                return response
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            self.rate_limiter.on_throttled(retry_after)
+            if attempt == self.max_429_retries or retry_after > self.max_retry_after_wait:
+                logger.warning(f"429 for {method} {url} (Retry-After {retry_after:.1f}s), giving up.")
+                break
+            logger.info("429 for %s %s, retry %d/%d after %.1fs",
+                        method, url, attempt + 1, self.max_429_retries, retry_after)
+        return response
+
+    def _get_json(self, endpoint, path, headers, params=None):
+        # Conditional GET through the response cache. Returns (status, payload); on a 304 the
+        # payload is the object parsed from the earlier 200, so it must not be mutated.
+        # 204 returns (204, None). Errors propagate to the caller.
+        url = self.transport.api_url(path)
+        cache = self.response_cache
+        key = cache.key(url, params) if cache.enabled else None
+        cached = cache.get(key) if key else None
+        if cached:
+            headers["If-None-Match"] = cached[0]
+        response = self._request(endpoint, "GET", url, headers=headers, params=params)
+        if response.status_code == 304 and cached:
+            cache.record(hit=True)
+            return 304, cached[1]
+        if key:
+            cache.record(hit=False)
+        if response.status_code == 204:
+            if key:
+                cache.discard(key)
+            return 204, None
+        response.raise_for_status()
+        payload = response.json()
+        etag = response.headers.get("ETag")
+        if key:
+            if etag:
+                cache.put(key, etag, payload)
+            else:
+                cache.discard(key)
+        return response.status_code, payload
+
+    def fetch_json(self, endpoint, path, params=None):
+        # GET a read endpoint; returns (status, payload) with status 304 when the cached payload
+        # is still current. Errors propagate to the caller.
+        headers = self._get_auth_header()
+        if not headers:
+            raise requests.exceptions.RequestException(f"Not authorized to fetch {path}")
+        return self._get_json(endpoint, path, headers, params)
+
     def start_stream(self, context_uri=None):
         headers = self._get_auth_header()
         if not headers:
@@ -247,32 +425,58 @@ class SpotifyClient:
         if not device:
             return False
 
-        if not context_uri:
-            response = requests.get(
-                "https://api.spotify.com/v1/browse/featured-playlists?limit=5",
-                headers=headers,
-            )
-            if response.status_code == 200:
-                playlists = response.json().get("playlists", {}).get("items", [])
+        try:
+            if not context_uri and self.catalogue is not None:
+                playlist = self.catalogue.sample()
+                if playlist:
+                    context_uri = playlist["uri"]
+                    logger.info("Selected catalogue playlist: %s", playlist.get("name"))
+
+            if not context_uri:
+                # Catalogue disabled or still empty: one inline lookup as before
+                try:
+                    _, payload = self._get_json(
+                        "featured_playlists", "browse/featured-playlists", dict(headers), params={"limit": 5}
+                    )
+                    playlists = (payload or {}).get("playlists", {}).get("items", [])
+                except (requests.exceptions.HTTPError, ValueError) as e:
+                    logger.warning(f"Featured playlists lookup failed: {str(e)}")
+                    playlists = []
                 if playlists:
                     playlist = random.choice(playlists)
                     context_uri = playlist["uri"]
-                    logger.info(f"Selected featured playlist: {playlist['name']}")
-
-        data = {}
-        if context_uri:
-            if "playlist" in context_uri or "album" in context_uri or "artist" in context_uri:
-                data["context_uri"] = context_uri
-                logger.info(f"Starting playback of context: {context_uri}")
-
-        endpoint = f"https://api.spotify.com/v1/me/player/play?device_id={device['id']}"
-        response = requests.put(endpoint, headers=headers, json=data)
+                    logger.info("Selected featured playlist: %s", playlist['name'])
+
+            data = {}
+            if context_uri:
+                if "playlist" in context_uri or "album" in context_uri or "artist" in context_uri:
+                    data["context_uri"] = context_uri
+                    logger.info("Starting playback of context: %s", context_uri)
+
+            endpoint = self.transport.api_url("me/player/play")
+            response = self._request(
+                "start_stream", "PUT", endpoint,
+                headers=headers, params={"device_id": device["id"]}, json=data,
+            )
+            if self._is_device_error(response):
+                logger.warning(f"Device {device['name']} no longer available, refreshing device list.")
+                self.invalidate_device_cache()
+                device = self.get_active_device()
+                if not device:
+                    return False
+                response = self._request(
+                    "start_stream", "PUT", endpoint,
+                    headers=headers, params={"device_id": device["id"]}, json=data,
+                )
 
-        if response.status_code in (200, 204):
-            logger.info(f"Successfully started playback on device: {device['name']}")
-            return context_uri if context_uri else True
-        else:
-            logger.error(f"Failed to start playback. Status code: {response.status_code}")
+            if response.status_code in (200, 204):
+                logger.info("Successfully started playback on device: %s", device['name'])
+                return context_uri if context_uri else True
+            else:
+                logger.error(f"Failed to start playback. Status code: {response.status_code}")
+                return False
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error starting stream: {str(e)}")
             return False
 
     def search(self, query, type="track", limit=20):
@@ -292,20 +496,21 @@ class SpotifyClient:
             "market": "from_token",
         }
         logger.debug(
-            f"Performing search: query='{query}', type='{type}', limit={params['limit']}"
+            "Performing search: query='%s', type='%s', limit=%d", query, type, params['limit']
         )
 
         try:
-            response = requests.get(
-                "https://api.spotify.com/v1/search",
+            response = self._request(
+                "search",
+                "GET",
+                self.transport.api_url("search"),
                 headers=headers,
                 params=params,
-                timeout=10,
             )
             response.raise_for_status()
 
             results = response.json()
-            logger.debug(f"Search successful for '{query}'.")
+            logger.debug("Search successful for '%s'.", query)
             return results
 
         except requests.exceptions.RequestException as e:
@@ -321,22 +526,49 @@ class SpotifyClient:
             logger.error(f"An unexpected error occurred during search: {str(e)}")
             return None
 
-    def get_active_device(self):
+    def invalidate_device_cache(self):
+        with self._device_lock:
+            self._device_cache = None
+            self._device_cache_time = 0
+
+    def _is_device_error(self, response):
+        if response.status_code == 404:
+            return True
+        try:
+            return "device not found" in response.text.lower()
+        except Exception:
+            return False
+
+    def get_active_device(self, use_cache=True):
+        if use_cache and self.device_cache_ttl > 0:
+            with self._device_lock:
+                device = self._device_cache
+                age = time.time() - self._device_cache_time
+            if device:
+                if age < self.device_cache_ttl:
+                    return device
+                # Serve the stale entry for one more TTL while it is refreshed in the background
+                if age < self.device_cache_ttl * 2:
+                    self._device_refresh.request()
+                    return device
+        return self._fetch_active_device()
+
+    def _fetch_active_device(self):
+        device = self._query_active_device()
+        with self._device_lock:
+            self._device_cache = device
+            self._device_cache_time = time.time() if device else 0
+        return device
+
+    def _query_active_device(self):
         headers = self._get_auth_header()
         if not headers:
             logger.error("Cannot get devices: Not authorized.")
             return None
 
         try:
-            response = requests.get(
-                "https://api.spotify.com/v1/me/player/devices",
-                headers=headers,
-                timeout=10,
-            )
-            response.raise_for_status()
-
-            devices_data = response.json()
-            devices = devices_data.get("devices", [])
+            _, devices_data = self._get_json("get_active_device", "me/player/devices", headers)
+            devices = (devices_data or {}).get("devices", [])
 
             if not devices:
                 logger.warning("No devices found for this user.")
@@ -347,14 +579,14 @@ class SpotifyClient:
             if active_devices:
                 selected_device = active_devices[0]
                 logger.info(
-                    f"Found active device: {selected_device.get('name')} (ID: {selected_device.get('id')})"
+                    "Found active device: %s (ID: %s)", selected_device.get('name'), selected_device.get('id')
                 )
                 return selected_device
             else:
                 logger.warning("No active device found. Selecting a random available device.")
                 selected_device = random.choice(devices)
                 logger.info(
-                    f"Selected fallback device: {selected_device.get('name')} (ID: {selected_device.get('id')})"
+                    "Selected fallback device: %s (ID: %s)", selected_device.get('name'), selected_device.get('id')
                 )
                 return selected_device
 
@@ -371,6 +603,92 @@ class SpotifyClient:
             logger.error(f"An unexpected error occurred getting devices: {str(e)}")
             return None
 
+    def get_playback_state(self):
+        # Returns the currently-playing object, {"is_playing": False} when nothing is
+        # playing, or None on error. Repeated polls are conditional through the response cache.
+        headers = self._get_auth_header()
+        if not headers:
+            logger.error("Cannot get playback state: Not authorized.")
+            return None
+
+        try:
+            status, state = self._get_json(
+                "get_playback_state", "me/player/currently-playing", headers, params={"market": "from_token"}
+            )
+            if status == 304:
+                logger.debug("Playback state not modified.")
+            elif status == 204:
+                state = {"is_playing": False}
+            return state
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error getting playback state: {str(e)}")
+            return None
+        except json.JSONDecodeError as e:
+            logger.error(f"Error decoding playback state response: {str(e)}")
+            return None
+
+    def add_to_queue(self, uri):
+        headers = self._get_auth_header()
+        if not headers:
+            logger.error("Cannot queue song: Not authorized.")
+            return False
+
+        device = self.get_active_device()
+        if not device:
+            logger.warning("Cannot queue song: No active/available device found.")
+            return False
+
+        endpoint = self.transport.api_url("me/player/queue")
+        try:
+            for attempt in range(2):
+                response = self._request(
+                    "add_to_queue", "POST", endpoint,
+                    headers=headers, params={"uri": uri, "device_id": device["id"]},
+                )
+                if response.status_code in (200, 202, 204):
+                    logger.info("Queued %s on device: %s", uri, device['name'])
+                    return True
+                if not self._is_device_error(response) or attempt == 1:
+                    break
+                logger.warning(f"Device {device.get('name')} no longer available, refreshing device list.")
+                self.invalidate_device_cache()
+                device = self.get_active_device()
+                if not device:
+                    return False
+            logger.error(f"Failed to queue {uri}. Status code: {response.status_code}")
+            return False
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error queueing song: {str(e)}")
+            return False
+
+    def next_track(self):
+        headers = self._get_auth_header()
+        if not headers:
+            logger.error("Cannot skip track: Not authorized.")
+            return False
+
+        device = self.get_active_device()
+        if not device:
+            logger.warning("Cannot skip track: No active/available device found.")
+            return False
+
+        try:
+            response = self._request(
+                "next_track", "POST", self.transport.api_url("me/player/next"),
+                headers=headers, params={"device_id": device["id"]},
+            )
+            if response.status_code in (200, 202, 204):
+                logger.debug("Skipped to next track on device: %s", device['name'])
+                return True
+            if self._is_device_error(response):
+                self.invalidate_device_cache()
+            logger.error(f"Failed to skip track. Status code: {response.status_code}")
+            return False
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error skipping track: {str(e)}")
+            return False
+
     def play_song(self, uri):
         headers = self._get_auth_header()
         if not headers:
@@ -389,34 +707,46 @@ class SpotifyClient:
         data = {
             "uris": [uri] if isinstance(uri, str) else uri,
         }
-        logger.debug(f"Preparing to play URIs: {data['uris']}")
-
-        endpoint = f"https://api.spotify.com/v1/me/player/play"
+        for attempt in range(2):
+            result = self._put_play(headers, device, data)
+            if result != "DEVICE_ERROR":
+                return result
+            if attempt == 0:
+                logger.warning(f"Device {device.get('name')} no longer available, refreshing device list.")
+                self.invalidate_device_cache()
+                device = self.get_active_device()
+                if not device:
+                    logger.warning("Cannot play song: No active/available device found.")
+                    return False
+        return False
+
+    def _put_play(self, headers, device, data):
+        endpoint = self.transport.api_url("me/player/play")
         params = {"device_id": device["id"]}
-        logger.info(
-            f"Requesting song playback: PUT {endpoint}?device_id={device['id']} with data={json.dumps(data)}"
-        )
+        logger.debug("Requesting song playback on device %s: %s", device['id'], data['uris'])
 
         try:
-            response = requests.put(
-                endpoint, headers=headers, params=params, json=data, timeout=10
+            response = self._request(
+                "play_song", "PUT", endpoint, headers=headers, params=params, json=data
             )
 
             if response.status_code in (200, 202, 204):
                 logger.info(
-                    f"Song playback request successful (Status: {response.status_code}) for URIs {data['uris']}"
+                    "Song playback request successful (Status: %d) for %d URI(s)",
+                    response.status_code, len(data['uris']),
                 )
                 return True
+            elif self._is_device_error(response):
+                logger.error(f"Song playback request failed, device not found: {response.status_code}")
+                return "DEVICE_ERROR"
             else:
                 logger.error(f"Song playback request failed: {response.status_code}")
                 try:
                     error_details = response.json()
-                    logger.error(f"Error details: {json.dumps(error_details)}")
+                    logger.error("Error details: %s", error_details)
                 except json.JSONDecodeError:
                     logger.error(f"Response body: {response.text}")
-                logger.error(
-                    f"Request details: PUT {endpoint}, Params: {params}, Headers: {headers}, Data: {json.dumps(data)}"
-                )
+                logger.error("Request details: PUT %s, Params: %s, URIs: %s", endpoint, params, data['uris'])
                 return False
 
         except requests.exceptions.RequestException as e:
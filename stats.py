@@ -0,0 +1,184 @@
+from datetime import datetime
+from collections import deque
+from array import array
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ('searches', 'streams', 'plays')
+ACTION_COUNTERS = {'search': 'searches', 'stream': 'streams', 'play': 'plays'}
+ACTION_MESSAGES = {
+    'search': "Search performed",
+    'stream': "Stream started",
+    'play': "Full play recorded",
+}
+
+
+class Stats:
+    def __init__(self, account_id=None, max_logs=100, window_minutes=1440, event_store=None):
+        self.account_id = account_id
+        self.event_store = event_store
+        self.searches = 0
+        self.streams = 0
+        self.plays = 0
+        self.logs = deque(maxlen=max_logs)
+        # Per-minute ring buffers; a slot is reused once its minute falls out of the window
+        self.window_minutes = window_minutes
+        self._minute_ids = array('q', [-1]) * window_minutes
+        self._minute_counts = {name: array('I', [0]) * window_minutes for name in COUNTERS}
+        self.seq = 0
+        # seq restarts with every process, so event ids carry an epoch and cursors from an
+        # earlier process never match and force a full snapshot
+        self.epoch = os.urandom(4).hex()
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        if event_store:
+            self.restore()
+
+    def _slot(self, minute):
+        slot = minute % self.window_minutes
+        if self._minute_ids[slot] != minute:
+            self._minute_ids[slot] = minute
+            for counts in self._minute_counts.values():
+                counts[slot] = 0
+        return slot
+
+    def add_log(self, message, action_type):
+        now = time.time()
+        timestamp = datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S")
+        counter = ACTION_COUNTERS.get(action_type)
+
+        with self.lock:
+            self.seq += 1
+            self.logs.appendleft({"seq": self.seq, "time": timestamp, "message": message, "type": action_type})
+            if counter:
+                total = getattr(self, counter) + 1
+                setattr(self, counter, total)
+                self._minute_counts[counter][self._slot(int(now // 60))] += 1
+            self.changed.notify_all()
+
+        if self.event_store:
+            self.event_store.append(self.account_id, now, action_type, message)
+
+        if counter:
+            logger.info("STAT[%s]: %s - Total: %d", self.account_id or "-", ACTION_MESSAGES[action_type], total)
+
+    def restore(self):
+        try:
+            totals = self.event_store.totals(self.account_id)
+            recent = self.event_store.query_events(self.account_id, limit=self.logs.maxlen)
+            since = (int(time.time() // 60) - self.window_minutes + 1) * 60
+            minutes = self.event_store.counts(self.account_id, since, bucket_seconds=60)
+        except Exception as e:
+            logger.error(f"Failed to restore stats for {self.account_id} from event store: {e}")
+            return
+
+        with self.lock:
+            for action_type, counter in ACTION_COUNTERS.items():
+                setattr(self, counter, totals.get(action_type, 0))
+            for event in reversed(recent):
+                self.seq += 1
+                self.logs.appendleft({
+                    "seq": self.seq,
+                    "time": datetime.fromtimestamp(event['ts']).strftime("%Y-%m-%d %H:%M:%S"),
+                    "message": event['message'],
+                    "type": event['action_type'],
+                })
+            for bucket in minutes:
+                slot = self._slot(int(bucket['start'] // 60))
+                for action_type, count in bucket['counts'].items():
+                    counter = ACTION_COUNTERS.get(action_type)
+                    if counter:
+                        self._minute_counts[counter][slot] = count
+        logger.info("Restored stats for %s: %d searches, %d streams, %d plays",
+                    self.account_id, self.searches, self.streams, self.plays)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'seq': self.seq,
+                'searches': self.searches,
+                'streams': self.streams,
+                'plays': self.plays,
+                'logs': list(self.logs),
+                'minute_ids': array('q', self._minute_ids),
+                'minute_counts': {name: array('I', c) for name, c in self._minute_counts.items()},
+            }
+
+    def event_id(self, seq):
+        return f"{self.epoch}-{seq}"
+
+    def parse_event_id(self, event_id):
+        # Returns the seq of an event id issued by this instance, otherwise None
+        epoch, _, seq = (event_id or "").partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def wait_for_changes(self, cursor, timeout):
+        with self.changed:
+            return self.changed.wait_for(lambda: self.seq != cursor, timeout)
+
+    def changes_since(self, cursor):
+        # None means the cursor is unknown or older than the log ring; send a full snapshot instead
+        with self.lock:
+            if cursor is None or cursor > self.seq:
+                return None
+            oldest = self.logs[-1]['seq'] if self.logs else self.seq + 1
+            if cursor < oldest - 1:
+                return None
+            logs = [entry for entry in self.logs if entry['seq'] > cursor]
+            seq = self.seq
+        deltas = dict.fromkeys(COUNTERS, 0)
+        for entry in logs:
+            counter = ACTION_COUNTERS.get(entry['type'])
+            if counter:
+                deltas[counter] += 1
+        return {
+            'seq': seq,
+            'logs': logs,
+            'deltas': deltas,
+            'hour': datetime.now().hour,
+        }
+
+    def _series(self, snapshot, minutes, now):
+        current = int(now // 60)
+        first = current - min(minutes, self.window_minutes) + 1
+        series = {name: [0] * (current - first + 1) for name in COUNTERS}
+        for slot, minute in enumerate(snapshot['minute_ids']):
+            if first <= minute <= current:
+                for name in COUNTERS:
+                    series[name][minute - first] = snapshot['minute_counts'][name][slot]
+        return series
+
+    def _hourly(self, snapshot, now):
+        # Rolling last 24 hours bucketed by local hour of day
+        current = int(now // 60)
+        first = current - min(1440, self.window_minutes) + 1
+        utc_offset = time.localtime(now).tm_gmtoff
+        hourly = {name: [0] * 24 for name in COUNTERS}
+        for slot, minute in enumerate(snapshot['minute_ids']):
+            if first <= minute <= current:
+                hour = (minute * 60 + utc_offset) // 3600 % 24
+                for name in COUNTERS:
+                    hourly[name][hour] += snapshot['minute_counts'][name][slot]
+        return hourly
+
+    def get_series(self, minutes=60):
+        return self._series(self.snapshot(), minutes, time.time())
+
+    def get_stats(self):
+        snapshot = self.snapshot()
+        now = time.time()
+        return {
+            'seq': snapshot['seq'],
+            'searches': snapshot['searches'],
+            'streams': snapshot['streams'],
+            'plays': snapshot['plays'],
+            'logs': snapshot['logs'],
+            'hourly_data': self._hourly(snapshot, now),
+            'minute_data': self._series(snapshot, 60, now),
+        }
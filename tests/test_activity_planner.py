@@ -0,0 +1,114 @@
+import random
+
+import pytest
+
+import activity_planner
+from activity_planner import ActivityPlanner
+from anonymizer import Anonymizer
+from playlist_catalogue import PlaylistCatalogue
+
+WORDS = ["music", "pop", "rock", "jazz", "chill"]
+
+
+@pytest.fixture(autouse=True, params=["numpy", "random"])
+def backend(request, monkeypatch):
+    # Every planner test runs with the NumPy batches and with the random-module fallback
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(activity_planner, "np", None)
+    return request.param
+
+
+def make_anonymizer():
+    anonymizer = Anonymizer(rng=random.Random(1), search_words=WORDS)
+    anonymizer.use_track_pool = False
+    return anonymizer
+
+
+def test_same_seed_gives_the_same_decisions():
+    first = ActivityPlanner(make_anonymizer(), seed=7)
+    second = ActivityPlanner(make_anonymizer(), seed=7)
+    draws = lambda p: [(p.min_duration(), p.continue_roll(), p.context_roll(), p.search_delay()) for _ in range(50)]
+    assert draws(first) == draws(second)
+
+
+def test_decisions_stay_within_the_anonymizer_ranges():
+    anonymizer = make_anonymizer()
+    planner = ActivityPlanner(anonymizer, horizon_hours=0.01, seed=3)
+    low, high = anonymizer.min_song_duration_range
+    delay_low, delay_high = anonymizer.search_delay_range
+    for _ in range(500):  # crosses several batch boundaries
+        assert low <= planner.min_duration() <= high
+        assert 0 <= planner.continue_roll() < 1
+        assert delay_low <= planner.search_delay() <= delay_high
+
+
+def test_search_queries_use_one_to_three_distinct_words():
+    planner = ActivityPlanner(make_anonymizer(), seed=5)
+    for _ in range(200):
+        words = planner.search_query().split(" ")
+        assert 1 <= len(words) <= 3
+        assert len(set(words)) == len(words)
+        assert set(words) <= set(WORDS)
+
+
+def test_forecast_does_not_consume_planned_decisions():
+    planner = ActivityPlanner(make_anonymizer(), seed=11)
+    reference = ActivityPlanner(make_anonymizer(), seed=11)
+    planner.forecast(hours=2)
+    assert [planner.min_duration() for _ in range(20)] == [reference.min_duration() for _ in range(20)]
+
+
+def test_forecast_totals_add_up():
+    anonymizer = make_anonymizer()
+    forecast = ActivityPlanner(anonymizer, seed=2).forecast(hours=3)
+    assert len(forecast["schedule"]) == 3
+    totals = forecast["totals"]
+    for key in ("songs", "full_plays", "context_streams", "searches", "api_calls"):
+        assert totals[key] == sum(hour[key] for hour in forecast["schedule"])
+    assert 0 < totals["full_plays"] < totals["songs"]
+    assert totals["searches"] <= 3 * 60 * anonymizer.max_searches_per_minute
+
+
+def test_forecast_leaves_the_live_plan_untouched():
+    planner = ActivityPlanner(make_anonymizer(), seed=4)
+    planner.min_duration()
+    remaining = planner._min_durations.remaining()
+    state = planner._rng.getstate()
+    planner.forecast(hours=168)
+    assert planner._min_durations.remaining() == remaining
+    assert planner._rng.getstate() == state
+
+
+def test_forecast_matches_the_decisions_that_follow():
+    planner = ActivityPlanner(make_anonymizer(), horizon_hours=0.01, seed=9)
+    forecast = planner.forecast(hours=1)
+    songs = forecast["totals"]["songs"]
+    reference = ActivityPlanner(make_anonymizer(), horizon_hours=0.01, seed=9)
+    assert [planner.continue_roll() for _ in range(songs)] == [reference.continue_roll() for _ in range(songs)]
+
+
+def test_numpy_and_fallback_forecasts_agree(backend, monkeypatch):
+    if backend != "numpy":
+        pytest.skip("compares the two code paths on one NumPy-drawn plan")
+    planner = ActivityPlanner(make_anonymizer(), seed=6)
+    vectorised = planner.forecast(hours=5)
+    monkeypatch.setattr(activity_planner, "np", None)
+    assert planner.forecast(hours=5)["schedule"] == vectorised["schedule"]
+
+
+def test_catalogue_refreshes_replace_per_context_lookups():
+    anonymizer = make_anonymizer()
+    planner = ActivityPlanner(anonymizer, seed=8)
+    inline = planner.forecast(hours=2)
+    assert all(hour["playlist_lookups"] == hour["context_streams"] for hour in inline["schedule"])
+
+    catalogue = PlaylistCatalogue(None, search_words=WORDS, ttl=1800)
+    with_catalogue = planner.forecast(hours=2, catalogue=catalogue)
+    assert with_catalogue["playlist_catalogue"]
+    assert all(hour["playlist_lookups"] == 2 * catalogue.requests_per_refresh()
+               for hour in with_catalogue["schedule"])
+    for before, after in zip(inline["schedule"], with_catalogue["schedule"]):
+        extra = after["playlist_lookups"] - before["playlist_lookups"]
+        assert abs(after["api_calls"] - before["api_calls"] - extra) <= 1  # rounded separately
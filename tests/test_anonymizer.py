@@ -0,0 +1,136 @@
+import random
+
+from anonymizer import Anonymizer
+from simulator import simulate
+from stats import Stats
+
+WORDS = ["music", "pop", "rock"]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class StreamClient:
+    # start_stream reports success without naming the context, like a resumed device
+    def __init__(self, result=True):
+        self.result = result
+
+    def start_stream(self, context_uri=None):
+        return self.result
+
+
+def make_anonymizer(**attrs):
+    anonymizer = Anonymizer(clock=Clock(), rng=random.Random(1), search_words=WORDS)
+    anonymizer.use_track_pool = False
+    for name, value in attrs.items():
+        setattr(anonymizer, name, value)
+    return anonymizer
+
+
+def state(track_uri, context_uri, progress_ms=1000, duration_ms=200000):
+    return {
+        "is_playing": True,
+        "progress_ms": progress_ms,
+        "item": {"uri": track_uri, "duration_ms": duration_ms},
+        "context": {"uri": context_uri} if context_uri else None,
+    }
+
+
+def test_unnamed_context_stream_adopts_the_players_context():
+    anonymizer = make_anonymizer(context_stream_chance=1.0, playback_state_mode=True)
+    assert anonymizer._start_new_stream(StreamClient(True), Stats("t"))
+    assert anonymizer.current_song["context_uri"] is None
+
+    anonymizer.sync_playback_state(state("spotify:track:a", "spotify:playlist:real"))
+    assert not anonymizer.current_song.get("ended")
+    assert anonymizer.current_song["context_uri"] == "spotify:playlist:real"
+
+    anonymizer.sync_playback_state(state("spotify:track:a", "spotify:playlist:real", progress_ms=5000))
+    assert not anonymizer.current_song.get("ended")
+
+    anonymizer.sync_playback_state(state("spotify:track:a", "spotify:playlist:other"))
+    assert anonymizer.current_song.get("ended")
+
+
+def test_named_context_stream_ends_when_the_context_changes():
+    anonymizer = make_anonymizer(context_stream_chance=1.0, playback_state_mode=True)
+    anonymizer._start_new_stream(StreamClient("spotify:playlist:x"), Stats("t"))
+    anonymizer.sync_playback_state(state("spotify:track:a", "spotify:playlist:x"))
+    assert not anonymizer.current_song.get("ended")
+    anonymizer.sync_playback_state(state("spotify:track:b", "spotify:playlist:y"))
+    assert anonymizer.current_song.get("ended")
+
+
+def test_track_ends_when_the_player_moves_on():
+    anonymizer = make_anonymizer(playback_state_mode=True)
+    anonymizer.current_song = {"uri": "spotify:track:a", "name": "a", "artists": []}
+    anonymizer.sync_playback_state(state("spotify:track:a", None))
+    assert not anonymizer.current_song.get("ended")
+    anonymizer.sync_playback_state(state("spotify:track:b", None))
+    assert anonymizer.current_song.get("ended")
+
+
+def test_gapless_batch_does_not_wake_up_before_the_batch_ends():
+    anonymizer = make_anonymizer(gapless_mode=True, batch_size=3, full_song_chance=1.0)
+    songs = [{"uri": f"spotify:track:{n}", "name": str(n), "duration_ms": 200000} for n in range(3)]
+    anonymizer.batch = songs
+    anonymizer.batch_index = 0
+    anonymizer._advance_to(songs[0], anonymizer.clock(), Stats("t"))
+
+    anonymizer.clock.now += 195  # inside the queue window of the first track
+    assert not anonymizer.queue_due()
+    assert anonymizer.next_change_time() == anonymizer.song_start_time + 200 + anonymizer.safety_buffer
+
+
+def test_gapless_batch_playback_cycles_stay_bounded():
+    # One wake-up per switch or queue, not a busy loop through every queue window
+    cycles = []
+
+    def configure(anonymizer):
+        anonymizer.gapless_mode = True
+        anonymizer.batch_size = 3
+        ensure = anonymizer.ensure_continuous_playback
+
+        def counted(*args):
+            cycles.append(1)
+            return ensure(*args)
+        anonymizer.ensure_continuous_playback = counted
+
+    report = simulate(1, 0, configure)
+    assert len(cycles) < 2 * report["songs_started"] + 50
+
+
+class EmptySearchClient:
+    def __init__(self):
+        self.searches = 0
+
+    def search(self, query):
+        self.searches += 1
+        return {"tracks": {"items": []}}
+
+    def add_to_queue(self, uri):
+        raise AssertionError("nothing should be queued")
+
+
+def test_failed_queue_search_is_backed_off():
+    anonymizer = make_anonymizer(gapless_mode=True, full_song_chance=1.0)
+    song = {"uri": "spotify:track:a", "name": "a", "duration_ms": 200000}
+    anonymizer._advance_to(song, anonymizer.clock(), Stats("t"))
+    client = EmptySearchClient()
+    end = anonymizer.song_start_time + 200
+
+    wake_ups = 0
+    anonymizer.clock.now = anonymizer.next_change_time()
+    while anonymizer.clock.now < end:
+        assert anonymizer.ensure_continuous_playback(client, Stats("t"))
+        wake_ups += 1
+        anonymizer.clock.now = max(anonymizer.next_change_time(), anonymizer.clock.now + 0.001)
+
+    window = anonymizer.queue_lead / anonymizer.queue_retry_delay
+    assert client.searches <= window + 1
+    assert wake_ups <= window + 2
@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+import app as webapp
+
+
+@pytest.fixture
+def engine(make_engine, monkeypatch):
+    engine = make_engine(account_ids=["alice", "bob"])
+    monkeypatch.setattr(webapp, "engine", engine)
+    return engine
+
+
+def test_index_redirects_unknown_account_to_first_configured(engine):
+    response = webapp.app.test_client().get("/")
+    assert response.status_code == 302
+    assert response.headers["Location"].endswith("/?account=alice")
+
+
+def test_index_renders_known_account(engine):
+    response = webapp.app.test_client().get("/?account=bob")
+    assert response.status_code == 200
+
+
+def test_index_without_accounts_is_404(engine):
+    engine.sessions.clear()
+    response = webapp.app.test_client().get("/?account=carol")
+    assert response.status_code == 404
+
+
+def read_events(response, count):
+    # Parses the first `count` SSE messages (keepalive comments included) off a streamed response
+    events, buffer = [], ""
+    chunks = iter(response.response)
+    while len(events) < count:
+        buffer += next(chunks).decode()
+        while "\n\n" in buffer and len(events) < count:
+            message, buffer = buffer.split("\n\n", 1)
+            if message.startswith(":"):
+                events.append({"event": "keepalive"})
+                continue
+            fields = dict(line.split(": ", 1) for line in message.split("\n"))
+            fields["data"] = json.loads(fields["data"])
+            events.append(fields)
+    return events
+
+
+def test_event_stream_sends_snapshot_delta_status_and_keepalive(engine, monkeypatch):
+    monkeypatch.setattr(webapp, "SSE_KEEPALIVE_INTERVAL", 0.05)
+    account = engine.get_session("alice")
+    response = webapp.app.test_client().get("/events?account=alice", buffered=False)
+    assert response.mimetype == "text/event-stream"
+    snapshot = read_events(response, 1)[0]
+    assert snapshot["event"] == "snapshot"
+    assert snapshot["id"] == account.stats.event_id(snapshot["data"]["seq"])
+
+    account.stats.add_log("Performed search: 'rock'", "search")
+    delta, keepalive = read_events(response, 2)
+    assert delta["event"] == "delta"
+    assert [entry["message"] for entry in delta["data"]["logs"]] == ["Performed search: 'rock'"]
+    assert keepalive == {"event": "keepalive"}
+
+    account.is_running = True
+    status = read_events(response, 1)[0]
+    assert status["event"] == "status" and "id" not in status
+    assert status["data"]["is_running"] is True
+    account.is_running = False
+    response.close()
+
+
+def test_event_stream_resumes_from_last_event_id(engine, monkeypatch):
+    monkeypatch.setattr(webapp, "SSE_KEEPALIVE_INTERVAL", 0.05)
+    stats = engine.get_session("alice").stats
+    stats.add_log("first", "search")
+    last_id = stats.event_id(stats.seq)
+    stats.add_log("second", "search")
+
+    client = webapp.app.test_client()
+    response = client.get("/events?account=alice", headers={"Last-Event-ID": last_id}, buffered=False)
+    delta = read_events(response, 1)[0]
+    assert delta["event"] == "delta"
+    assert [entry["message"] for entry in delta["data"]["logs"]] == ["second"]
+    assert delta["id"] == stats.event_id(stats.seq)
+    response.close()
+
+    # An id from an earlier process (other epoch) falls back to a full snapshot
+    response = client.get("/events?account=alice", headers={"Last-Event-ID": "0000-1"}, buffered=False)
+    assert read_events(response, 1)[0]["event"] == "snapshot"
+    response.close()
+
+
+def test_schedule_counts_catalogue_refreshes(engine):
+    session = engine.get_session("alice")
+    engine.start(session)
+    engine.stop(session)
+    forecast = webapp.app.test_client().get("/schedule?account=alice&hours=2").get_json()
+    assert forecast["playlist_catalogue"]
+    assert forecast["totals"]["playlist_lookups"] == 2 * session.client.catalogue.requests_per_refresh()
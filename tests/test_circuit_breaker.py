@@ -0,0 +1,108 @@
+import random
+
+import pytest
+import requests
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, backoff_delay
+from rate_limiter import RateLimiter
+from spotify_client import SpotifyClient
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.on_failure()
+    assert breaker.state == OPEN
+
+
+def expire(breaker):
+    breaker.open_until = 0
+
+
+def test_opens_after_threshold_and_closes_after_a_successful_probe():
+    breaker = CircuitBreaker("x", failure_threshold=3)
+    breaker.on_failure()
+    breaker.on_failure()
+    assert breaker.allow() and breaker.state == CLOSED
+    breaker.on_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    expire(breaker)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # only one probe at a time
+    breaker.on_success()
+    assert breaker.state == CLOSED and breaker.failures == 0 and breaker.trips == 0
+
+
+def test_failed_probe_reopens_with_a_longer_timeout():
+    breaker = CircuitBreaker("x", failure_threshold=1, reset_timeout=10, max_reset_timeout=1000)
+    breaker.on_failure()
+    expire(breaker)
+    assert breaker.allow()
+    breaker.on_failure()
+    assert breaker.state == OPEN
+    assert breaker.trips == 2
+    assert breaker.retry_in() > 9.5  # the second trip waits at least half of 2 * reset_timeout
+
+
+def test_release_frees_the_probe_slot():
+    breaker = CircuitBreaker("x", failure_threshold=1)
+    open_breaker(breaker)
+    expire(breaker)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_stuck_probe_times_out():
+    breaker = CircuitBreaker("x", failure_threshold=1, probe_timeout=0)
+    open_breaker(breaker)
+    expire(breaker)
+    assert breaker.allow()
+    assert breaker.allow()
+
+
+def test_backoff_delay_has_equal_jitter_and_a_cap():
+    rng = random.Random(3)
+    for attempt in range(12):
+        step = min(60, 2 * 2 ** attempt)
+        delay = backoff_delay(attempt, 2, 60, rng)
+        assert step / 2 <= delay <= step
+
+
+class RaisingTransport:
+    def __init__(self, error):
+        self.error = error
+
+    def api_url(self, path):
+        return f"http://fake/v1/{path}"
+
+    def request(self, method, url, **kwargs):
+        raise self.error
+
+
+def make_client(tmp_path, error):
+    client = SpotifyClient(transport=RaisingTransport(error), token_file=str(tmp_path / "token.json"),
+                           rate_limiter=RateLimiter(rate=1000, burst=1000))
+    return client
+
+
+def test_unexpected_error_in_a_probe_does_not_black_out_the_endpoint(tmp_path):
+    client = make_client(tmp_path, ValueError("bad url"))
+    breaker = client._breaker("search")
+    open_breaker(breaker)
+    expire(breaker)
+    with pytest.raises(ValueError):
+        client._request("search", "GET", "http://fake/v1/search")
+    assert breaker.allow()
+
+
+def test_network_errors_trip_the_breaker(tmp_path):
+    client = make_client(tmp_path, requests.exceptions.ConnectionError("down"))
+    breaker = client._breaker("search")
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client._request("search", "GET", "http://fake/v1/search")
+    with pytest.raises(CircuitOpenError):
+        client._request("search", "GET", "http://fake/v1/search")
@@ -0,0 +1,47 @@
+import threading
+
+from daemon import Daemon
+
+
+def test_reload_without_new_accounts_starts_nothing(make_engine, monkeypatch):
+    monkeypatch.setenv("SPOTIFUCK_ACCOUNTS", "alice")
+    daemon = make_engine(Daemon, account_ids=["alice"])
+    started = []
+    monkeypatch.setattr(daemon, "start_accounts", lambda ids: started.append(list(ids)))
+    assert daemon.reload_accounts() == []
+    assert started == []
+
+
+def test_reload_starts_only_new_accounts(make_engine, monkeypatch):
+    monkeypatch.setenv("SPOTIFUCK_ACCOUNTS", "alice,bob")
+    daemon = make_engine(Daemon, account_ids=["alice"])
+    started = []
+    monkeypatch.setattr(daemon, "start_accounts", lambda ids: started.append(list(ids)))
+    assert daemon.reload_accounts() == ["bob"]
+    assert started == [["bob"]]
+    assert daemon.engine.get_session("bob") is not None
+
+
+def test_signal_requests_run_on_the_main_loop_and_survive_errors(make_engine, monkeypatch):
+    daemon = make_engine(Daemon, account_ids=["alice"])
+    calls = []
+    done = threading.Event()
+
+    def failing_reload():
+        calls.append(threading.current_thread())
+        if len(calls) == 2:
+            done.set()
+        raise RuntimeError("reload broke")
+
+    monkeypatch.setattr(daemon, "reload_accounts", failing_reload)
+    runner = threading.Thread(target=daemon.run, kwargs={"autostart": False}, daemon=True)
+    runner.start()
+    try:
+        daemon.request_reload()
+        daemon.request_reload()
+        assert done.wait(timeout=10)
+    finally:
+        daemon.request_stop()
+        runner.join(timeout=10)
+    assert not runner.is_alive()
+    assert calls == [runner, runner]
@@ -0,0 +1,81 @@
+import os
+
+from engine import token_file_for
+
+
+def test_token_dir_overrides_token_locations(tmp_path):
+    assert token_file_for("default") == "token_info.json"
+    assert token_file_for("alice") == os.path.join("tokens", "alice.json")
+    assert token_file_for("default", str(tmp_path)) == str(tmp_path / "default.json")
+
+
+def test_engine_sessions_use_token_dir(make_engine, tmp_path):
+    token_dir = tmp_path / "bench-tokens"
+    engine = make_engine(account_ids=["bench0", "default"], token_dir=str(token_dir))
+    for session in engine.sessions.values():
+        assert os.path.dirname(session.client.token_file) == str(token_dir)
+
+
+def test_restart_forgets_the_queued_song(make_engine):
+    engine = make_engine(account_ids=["alice"])
+    session = engine.get_session("alice")
+    engine.start(session)
+    engine.stop(session)
+    session.anonymizer.queued_song = {"uri": "spotify:track:stale", "name": "stale", "artists": []}
+    engine.start(session)
+    assert session.anonymizer.queued_song is None
+    engine.stop(session)
+
+
+class BrokenAnonymizer:
+    def __init__(self):
+        self.calls = 0
+
+    def reserve_search(self):
+        self.calls += 1
+        raise RuntimeError("boom")
+
+
+def test_search_dispatch_reschedules_after_an_error(make_engine):
+    engine = make_engine(account_ids=["alice"])
+    session = engine.get_session("alice")
+    session.anonymizer = BrokenAnonymizer()
+    session.is_running = True
+    engine._dispatch_search(session, session.generation)
+    assert session.anonymizer.calls == 1
+    assert ("alice", "_search") in engine.scheduler._live
+
+
+def test_search_dispatch_reschedules_when_the_pool_is_gone(make_engine):
+    engine = make_engine(account_ids=["alice"])
+    session = engine.get_session("alice")
+    session.anonymizer = type("A", (), {
+        "reserve_search": lambda self: True,
+        "get_random_search": lambda self: "rock",
+        "next_search_deadline": lambda self: 0,
+    })()
+    session.is_running = True
+    engine.search_executor.shutdown()
+    engine._dispatch_search(session, session.generation)
+    assert engine._searches_in_flight == 0
+    assert ("alice", "_search") in engine.scheduler._live
+
+
+def test_search_stops_an_unauthorized_account(make_engine):
+    engine = make_engine(account_ids=["alice"])
+    session = engine.get_session("alice")
+    session.is_running = True
+    engine._searches_in_flight = 1
+    engine._search(session, session.generation, "rock")
+    assert not session.is_running
+    assert engine._searches_in_flight == 0
+
+
+def test_background_prefetch_stays_off_the_playback_pool(make_engine):
+    engine = make_engine(account_ids=["alice"])
+    session = engine.get_session("alice")
+    engine.start(session)
+    engine.stop(session)
+    assert session.anonymizer.track_pool.executor is engine.prefetch_executor
+    assert session.client.catalogue.executor is engine.prefetch_executor
+    assert engine.prefetch_executor not in (engine.executor, engine.search_executor)
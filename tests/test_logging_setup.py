@@ -0,0 +1,47 @@
+import io
+import logging
+
+from logging_setup import SamplingFilter, setup_logging, stop_logging
+
+
+def record(name, msg, level=logging.INFO, lineno=10, pathname="engine.py"):
+    return logging.LogRecord(name, level, pathname, lineno, msg, None, None)
+
+
+def test_samples_every_nth_record_per_call_site():
+    sampler = SamplingFilter(10)
+    passed = sum(sampler.filter(record("engine", f"[acct{i}] started")) for i in range(100))
+    assert passed == 10
+    assert len(sampler._counts) == 1
+
+
+def test_call_sites_are_counted_separately():
+    sampler = SamplingFilter(3)
+    first = [sampler.filter(record("engine", "a", lineno=1)) for _ in range(3)]
+    second = [sampler.filter(record("engine", "b", lineno=2)) for _ in range(3)]
+    assert first == second == [True, False, False]
+
+
+def test_warnings_and_other_loggers_always_pass():
+    sampler = SamplingFilter(100)
+    assert all(sampler.filter(record("engine", "x", level=logging.WARNING)) for _ in range(5))
+    assert all(sampler.filter(record("werkzeug", "x")) for _ in range(5))
+
+
+def test_setup_logging_sampled_output():
+    stream = io.StringIO()
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    setup_logging(level="INFO", async_logging=True, sample_rate=5, stream=stream)
+    try:
+        log = logging.getLogger("engine")
+        for i in range(20):
+            log.info("tick %d", i)
+        log.warning("kept")
+    finally:
+        stop_logging()
+        root.handlers[:] = saved_handlers
+        root.setLevel(saved_level)
+    lines = stream.getvalue().splitlines()
+    assert len([line for line in lines if "tick" in line]) == 4
+    assert any("kept" in line for line in lines)
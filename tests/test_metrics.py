@@ -0,0 +1,38 @@
+from metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency.", ("endpoint",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, "search")
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{endpoint="search",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{endpoint="search",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{endpoint="search",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{endpoint="search"} 4' in lines
+    assert 'latency_seconds_sum{endpoint="search"} 6.05' in lines
+
+
+def test_counter_escapes_label_values():
+    counter = Counter("requests_total", "Requests.", ("status",))
+    counter.inc('a"b\\c')
+    counter.inc('a"b\\c', amount=2)
+    assert 'requests_total{status="a\\"b\\\\c"} 3' in counter.render()
+
+
+def test_gauge_is_evaluated_at_scrape_time_and_survives_errors():
+    gauge = Gauge("depth", "Depth.", ("queue",))
+    value = {"n": 1}
+    gauge.set_function(lambda: {("work",): value["n"]})
+    value["n"] = 7
+    assert 'depth{queue="work"} 7' in gauge.render()
+    gauge.set_function(lambda: 1 / 0)
+    assert gauge.render() == gauge.header()
+
+
+def test_registry_renders_help_and_type_lines():
+    registry = Registry()
+    registry.register(Counter("events_total", "Events."))
+    text = registry.render()
+    assert text.startswith("# HELP events_total Events.\n# TYPE events_total counter\n")
+    assert text.endswith("\n")
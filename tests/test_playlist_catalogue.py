@@ -0,0 +1,110 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from playlist_catalogue import REFRESH_RETRY_DELAY, PlaylistCatalogue
+
+
+def playlists(prefix, count):
+    return {"playlists": {"items": [{"uri": f"spotify:playlist:{prefix}{i}", "name": f"{prefix} {i}"}
+                                    for i in range(count)] + [None]}}
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+        self.unchanged = set()
+        self.failing = False
+
+    def fetch_json(self, endpoint, path, params=None):
+        self.calls.append((path, dict(params or {})))
+        if self.failing:
+            raise requests.exceptions.ConnectionError("down")
+        if path in self.unchanged:
+            return 304, None
+        if path == "browse/featured-playlists":
+            return 200, playlists("featured", 3)
+        if path == "browse/categories":
+            return 200, {"categories": {"items": [{"id": "mood"}, {"id": "party"}]}}
+        if path.startswith("browse/categories/"):
+            return 200, playlists(path.split("/")[2], 2)
+        if path == "search":
+            # Overlaps with the featured playlists, which must be deduplicated
+            return 200, playlists("featured", 2)
+        raise AssertionError(path)
+
+
+def make_catalogue(client=None, **kwargs):
+    return PlaylistCatalogue(client or FakeClient(), search_words=["rock", "jazz"], rng=random.Random(1), **kwargs)
+
+
+def test_refresh_merges_and_deduplicates_sources():
+    catalogue = make_catalogue()
+    catalogue.refresh()
+    uris = sorted(p["uri"] for p in catalogue._playlists)
+    assert uris == sorted(
+        [f"spotify:playlist:featured{i}" for i in range(3)]
+        + [f"spotify:playlist:{c}{i}" for c in ("mood", "party") for i in range(2)]
+    )
+    searches = [params for path, params in catalogue.spotify_client.calls if path == "search"]
+    assert len(searches) == catalogue.searches_per_refresh
+    assert all(params["type"] == "playlist" and params["q"] for params in searches)
+
+
+def test_not_modified_sources_keep_their_items():
+    client = FakeClient()
+    catalogue = make_catalogue(client)
+    catalogue.refresh()
+    before = len(catalogue)
+    client.unchanged = {"browse/featured-playlists", "browse/categories"}
+    catalogue.refresh()
+    assert len(catalogue) == before
+
+
+def test_failed_refresh_keeps_the_list_and_retries_soon():
+    client = FakeClient()
+    catalogue = make_catalogue(client, ttl=3600)
+    catalogue.refresh()
+    before = len(catalogue)
+    client.failing = True
+    catalogue.refresh()
+    assert len(catalogue) == before
+    # Stale again once the retry delay has passed rather than after a full TTL
+    stale_in = catalogue._refreshed_at + catalogue.ttl - time.time()
+    assert abs(stale_in - REFRESH_RETRY_DELAY) < 5
+
+
+def test_max_playlists_caps_the_catalogue():
+    catalogue = make_catalogue(max_playlists=2)
+    catalogue.refresh()
+    assert len(catalogue) == 2
+
+
+def test_sample_refreshes_in_the_background():
+    executor = ThreadPoolExecutor(max_workers=1)
+    catalogue = make_catalogue(executor=executor)
+    assert catalogue.sample() is None
+    executor.shutdown(wait=True)
+    assert catalogue.sample()["uri"].startswith("spotify:playlist:")
+
+
+
+def test_refresh_started_before_clear_is_dropped():
+    client = FakeClient()
+    catalogue = make_catalogue(client)
+    catalogue.refresh()
+    fetch_json = client.fetch_json
+
+    def reauthorized_mid_refresh(*args):
+        # The client is authorized as another user while the refresh is still fetching
+        result = fetch_json(*args)
+        catalogue.clear()
+        return result
+
+    client.fetch_json = reauthorized_mid_refresh
+    catalogue.refresh()
+    assert len(catalogue) == 0
+    assert catalogue._sources == {}
+    assert catalogue._refreshed_at == 0
@@ -0,0 +1,49 @@
+import time
+from email.utils import formatdate
+
+from rate_limiter import RateLimiter, parse_retry_after
+
+
+def test_burst_then_paced_by_rate():
+    limiter = RateLimiter(rate=50, burst=5)
+    start = time.monotonic()
+    for _ in range(5):
+        assert limiter.acquire(timeout=0)
+    assert not limiter.acquire(timeout=0)
+    assert limiter.acquire(timeout=1)
+    assert time.monotonic() - start >= 0.015  # one token at 50 req/s takes 20 ms
+
+
+def test_acquire_gives_up_when_the_wait_exceeds_the_timeout():
+    limiter = RateLimiter(rate=1, burst=1)
+    assert limiter.acquire(timeout=0)
+    start = time.monotonic()
+    assert not limiter.acquire(timeout=0.1)
+    assert time.monotonic() - start < 0.5
+
+
+def test_throttling_pauses_halves_the_rate_and_recovers():
+    limiter = RateLimiter(rate=10, burst=10, recovery_step=2)
+    limiter.on_throttled(0.2)
+    assert limiter.rate == 5
+    assert limiter.status()["throttled"] == 1
+    assert not limiter.acquire(timeout=0.05)
+    assert limiter.acquire(timeout=1)
+    for _ in range(10):
+        limiter.on_success()
+    assert limiter.rate == limiter.max_rate
+
+
+def test_rate_never_drops_below_the_floor():
+    limiter = RateLimiter(rate=10, burst=10, min_rate=2)
+    for _ in range(10):
+        limiter.on_throttled(0)
+    assert limiter.rate == 2
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) == 1.0
+    assert parse_retry_after("soon", default=2.0) == 2.0
+    assert 8 <= parse_retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10
+    assert parse_retry_after("-5") == 0.0
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from playlist_catalogue import PlaylistCatalogue
+from response_cache import ResponseCache, estimate_size
+
+
+def test_evicts_least_recently_used_by_count():
+    cache = ResponseCache(max_entries=2, max_bytes=1000)
+    cache.put("a", '"1"', {}, size=10)
+    cache.put("b", '"2"', {}, size=10)
+    assert cache.get("a") == ('"1"', {})
+    cache.put("c", '"3"', {}, size=10)
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+
+
+def test_evicts_by_size_and_skips_oversized_payloads():
+    cache = ResponseCache(max_entries=10, max_bytes=100)
+    cache.put("a", '"1"', {}, size=60)
+    cache.put("b", '"2"', {}, size=60)
+    assert cache.get("a") is None
+    assert cache.status()["bytes"] == 60
+    cache.put("b", '"3"', {}, size=500)
+    assert len(cache) == 0 and cache.status()["bytes"] == 0
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResponseCache(max_entries=0)
+    assert not cache.enabled
+    cache.put("a", '"1"', {"x": 1})
+    assert len(cache) == 0
+
+
+def test_size_estimate_covers_the_parsed_object():
+    payload = {"items": [{"uri": f"spotify:track:{i}", "name": "x" * 20} for i in range(50)]}
+    assert estimate_size(payload) > len(json.dumps(payload))
+
+
+def test_key_ignores_param_order():
+    assert ResponseCache.key("u", {"a": 1, "b": 2}) == ResponseCache.key("u", {"b": 2, "a": 1})
+
+
+@pytest.fixture
+def client(make_client):
+    return make_client()
+
+
+def test_not_modified_reuses_the_parsed_payload(client):
+    first = client.fetch_json("featured_playlists", "browse/featured-playlists", {"limit": 5})
+    second = client.fetch_json("featured_playlists", "browse/featured-playlists", {"limit": 5})
+    assert first[0] == 200 and second[0] == 304
+    assert second[1] is first[1]
+    assert client.response_cache.status()["hits"] == 1
+
+
+def test_new_authorization_forgets_the_previous_user(client):
+    client.catalogue = PlaylistCatalogue(client, search_words=["rock"])
+    client.catalogue.refresh()
+    assert len(client.catalogue) and len(client.response_cache)
+    assert client.get_token("code")
+    assert len(client.catalogue) == 0 and client.catalogue._sources == {}
+    assert len(client.response_cache) == 0
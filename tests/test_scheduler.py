@@ -0,0 +1,82 @@
+import threading
+import time
+
+from scheduler import DeadlineScheduler
+
+
+def run_in_thread(scheduler):
+    thread = threading.Thread(target=scheduler.run, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_runs_callbacks_in_deadline_order():
+    scheduler = DeadlineScheduler()
+    ran = []
+    done = threading.Event()
+    now = time.time()
+    scheduler.schedule("c", now + 0.06, lambda: (ran.append("c"), done.set()))
+    scheduler.schedule("a", now + 0.02, lambda: ran.append("a"))
+    scheduler.schedule("b", now + 0.04, lambda: ran.append("b"))
+    thread = run_in_thread(scheduler)
+    assert done.wait(5)
+    scheduler.stop()
+    thread.join(5)
+    assert ran == ["a", "b", "c"]
+
+
+def test_rescheduling_a_key_replaces_it_and_cancel_drops_it():
+    scheduler = DeadlineScheduler()
+    ran = []
+    done = threading.Event()
+    now = time.time()
+    scheduler.schedule("x", now, lambda: ran.append("x-old"))
+    scheduler.schedule("x", now + 0.02, lambda: ran.append("x-new"))
+    scheduler.schedule("y", now, lambda: ran.append("y"))
+    scheduler.cancel("y")
+    scheduler.schedule("end", now + 0.05, done.set)
+    assert len(scheduler) == 2
+    thread = run_in_thread(scheduler)
+    assert done.wait(5)
+    scheduler.stop()
+    thread.join(5)
+    assert ran == ["x-new"]
+
+
+def test_callbacks_can_reschedule_and_errors_do_not_stop_the_loop():
+    scheduler = DeadlineScheduler()
+    ticks = []
+    done = threading.Event()
+
+    def tick():
+        ticks.append(time.time())
+        if len(ticks) < 3:
+            scheduler.schedule("tick", time.time() + 0.01, tick)
+        else:
+            done.set()
+
+    def broken():
+        raise RuntimeError("boom")
+
+    scheduler.schedule("broken", time.time(), broken)
+    scheduler.schedule("tick", time.time(), tick)
+    thread = run_in_thread(scheduler)
+    assert done.wait(5)
+    scheduler.stop()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert len(ticks) == 3
+
+
+def test_earlier_deadline_wakes_a_waiting_loop():
+    scheduler = DeadlineScheduler()
+    done = threading.Event()
+    scheduler.schedule("late", time.time() + 60, lambda: None)
+    thread = run_in_thread(scheduler)
+    time.sleep(0.02)
+    start = time.time()
+    scheduler.schedule("soon", time.time(), done.set)
+    assert done.wait(5)
+    assert time.time() - start < 1
+    scheduler.stop()
+    thread.join(5)
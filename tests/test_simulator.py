@@ -0,0 +1,45 @@
+import random
+
+import engine
+import simulator
+from simulator import SimClient, VirtualClock, simulate
+
+
+def test_context_stream_reports_a_playing_item():
+    clock = VirtualClock()
+    client = SimClient(clock, random.Random(1), track_duration_range=(100, 100))
+    context = client.start_stream()
+    state = client.get_playback_state()
+    assert state["is_playing"]
+    assert state["context"] == {"uri": context}
+    first = state["item"]["uri"]
+
+    clock.now = 150  # the context moves on to its next track
+    state = client.get_playback_state()
+    assert state["context"] == {"uri": context}
+    assert state["item"]["uri"] != first
+    assert state["progress_ms"] == 50000
+
+
+def test_playing_a_track_leaves_the_context():
+    client = SimClient(VirtualClock(), random.Random(1))
+    client.start_stream()
+    track = client.search("x")["tracks"]["items"][0]
+    client.play_song(track["uri"])
+    assert client.get_playback_state()["context"] is None
+
+
+def test_playback_state_mode_keeps_the_full_play_ratio():
+    def ratio(playback_state_mode):
+        reports = [
+            simulate(6, seed, lambda a: setattr(a, "playback_state_mode", playback_state_mode))
+            for seed in range(3)
+        ]
+        return sum(r["full_play_ratio"] for r in reports) / len(reports)
+
+    assert abs(ratio(True) - ratio(False)) < 0.05
+
+
+def test_retry_policy_matches_the_engine():
+    assert simulator.PLAYBACK_RETRY_DELAY == engine.PLAYBACK_RETRY_DELAY
+    assert simulator.MAX_RETRY_DELAY == engine.MAX_RETRY_DELAY
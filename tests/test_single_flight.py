@@ -0,0 +1,61 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from single_flight import SingleFlight
+
+
+def test_requests_are_dropped_while_a_run_is_in_flight():
+    started, release = threading.Event(), threading.Event()
+    runs = []
+
+    def target():
+        runs.append(1)
+        started.set()
+        release.wait(5)
+
+    task = SingleFlight(target, "test task")
+    assert task.request()
+    started.wait(5)
+    assert not task.request()
+    assert task.busy
+    release.set()
+    executor = ThreadPoolExecutor(max_workers=1)
+    deadline = time.time() + 5
+    while task.busy and time.time() < deadline:
+        time.sleep(0.01)
+    assert task.request(executor)
+    executor.shutdown(wait=True)
+    assert len(runs) == 2
+    assert not task.busy
+
+
+def test_a_failing_run_frees_the_slot():
+    def target():
+        raise RuntimeError("boom")
+
+    task = SingleFlight(target, "test task")
+    executor = ThreadPoolExecutor(max_workers=1)
+    task.request(executor)
+    executor.shutdown(wait=True)
+    assert not task.busy
+
+
+def test_a_shut_down_executor_frees_the_slot():
+    executor = ThreadPoolExecutor(max_workers=1)
+    executor.shutdown()
+    task = SingleFlight(lambda: None, "test task")
+    assert not task.request(executor)
+    assert not task.busy
+
+
+def test_a_cancelled_run_frees_the_slot():
+    executor = ThreadPoolExecutor(max_workers=1)
+    blocker = threading.Event()
+    executor.submit(blocker.wait)
+    task = SingleFlight(lambda: None, "test task")
+    assert task.request(executor)
+    assert task.busy
+    executor.shutdown(wait=False, cancel_futures=True)
+    blocker.set()
+    assert not task.busy
@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+
+def test_concurrent_callers_share_one_token_refresh(fake_spotify, make_client):
+    fake_spotify.config.latency = 0.05  # long enough for the callers to overlap with the refresh
+    client = make_client(authorized=False)
+    client.token_info = {"access_token": "old", "refresh_token": "r", "expires_at": time.time() - 10}
+    barrier = threading.Barrier(10)
+    results = []
+
+    def call():
+        barrier.wait()
+        results.append(client.search("rock"))
+
+    threads = [threading.Thread(target=call) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert len(results) == 10 and all(results)
+    assert fake_spotify.calls[("POST", "/api/token")] == 1
+    assert fake_spotify.calls[("GET", "/v1/search")] == 10
+    assert client.token_info["refresh_token"] == "r"
+
+
+def test_saved_token_round_trips(make_client, tmp_path):
+    token_file = tmp_path / "tokens" / "alice.json"
+    client = make_client(token_file, authorized=False)
+    client.token_info = {"access_token": "a", "refresh_token": "r", "expires_at": time.time() + 3600}
+    client.save_token()
+    assert os.listdir(token_file.parent) == ["alice.json"]  # the temp file was renamed into place
+    assert make_client(token_file, authorized=False).token_info == client.token_info
+
+
+def test_refreshed_token_is_written_to_disk(make_client, tmp_path):
+    token_file = tmp_path / "token.json"
+    client = make_client(token_file, authorized=False)
+    client.token_info = {"access_token": "old", "refresh_token": "r", "expires_at": time.time() - 10}
+    assert client.refresh_token()
+    saved = json.loads(token_file.read_text())
+    assert saved["access_token"] == client.token_info["access_token"] != "old"
+    assert saved["refresh_token"] == "r"
+    assert make_client(token_file, authorized=False).is_authorized()
+
+
+DEVICES = ("GET", "/v1/me/player/devices")
+
+
+def wait_for_device_refresh(client):
+    deadline = time.time() + 5
+    while client._device_refresh.busy and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_active_device_is_served_from_the_cache(fake_spotify, make_client):
+    client = make_client()
+    first = client.get_active_device()
+    assert client.get_active_device() == first
+    assert fake_spotify.calls[DEVICES] == 1
+
+
+def test_stale_device_is_served_while_it_is_revalidated(fake_spotify, make_client):
+    client = make_client()
+    cached = client.get_active_device()
+    client._device_cache_time -= client.device_cache_ttl * 1.5
+    fake_spotify.device_id = "other-device"
+    assert client.get_active_device() == cached
+    wait_for_device_refresh(client)
+    assert fake_spotify.calls[DEVICES] == 2
+    assert client.get_active_device()["id"] == "other-device"
+    assert fake_spotify.calls[DEVICES] == 2
+
+
+def test_expired_device_is_fetched_inline(fake_spotify, make_client):
+    client = make_client()
+    client.get_active_device()
+    client._device_cache_time -= client.device_cache_ttl * 3
+    fake_spotify.device_id = "other-device"
+    assert client.get_active_device()["id"] == "other-device"
+
+
+@pytest.mark.parametrize("call, route", [
+    (lambda client: client.play_song("spotify:track:1"), ("PUT", "/v1/me/player/play")),
+    (lambda client: client.start_stream("spotify:playlist:1"), ("PUT", "/v1/me/player/play")),
+    (lambda client: client.add_to_queue("spotify:track:1"), ("POST", "/v1/me/player/queue")),
+])
+def test_device_not_found_refreshes_the_device_and_retries(fake_spotify, make_client, call, route):
+    client = make_client()
+    client.get_active_device()
+    fake_spotify.device_id = "other-device"  # the cached device went away
+    assert call(client)
+    assert fake_spotify.calls[route] == 2
+    assert fake_spotify.calls[DEVICES] == 2
+    assert client.get_active_device()["id"] == "other-device"
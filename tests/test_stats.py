@@ -0,0 +1,100 @@
+import sqlite3
+import time
+
+from event_store import EventStore
+from stats import Stats
+
+
+def make_store(tmp_path):
+    return EventStore(str(tmp_path / "events.db"), flush_interval=0.05)
+
+
+def test_restore_uses_running_totals(tmp_path):
+    store = make_store(tmp_path)
+    stats = Stats("alice", event_store=store)
+    for _ in range(3):
+        stats.add_log("searched", "search")
+    stats.add_log("streamed", "stream")
+    store.close()
+
+    store = make_store(tmp_path)
+    restored = Stats("alice", event_store=store)
+    assert (restored.searches, restored.streams, restored.plays) == (3, 1, 0)
+    assert store.totals("alice") == {"search": 3, "stream": 1}
+    assert len(restored.logs) == 4
+    store.close()
+
+
+def test_totals_backfilled_for_existing_database(tmp_path):
+    path = str(tmp_path / "events.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, account TEXT NOT NULL, ts REAL NOT NULL, "
+                 "action_type TEXT NOT NULL, message TEXT)")
+    conn.executemany("INSERT INTO events (account, ts, action_type, message) VALUES (?, ?, ?, ?)",
+                     [("bob", time.time(), "play", "x")] * 5)
+    conn.commit()
+    conn.close()
+
+    store = EventStore(path, flush_interval=0.05)
+    store.append("bob", time.time(), "play", "y")
+    store.close()
+    assert store.totals("bob") == {"play": 6}
+
+
+def test_event_ids_from_an_earlier_process_force_a_snapshot(tmp_path):
+    store = make_store(tmp_path)
+    first = Stats("alice", event_store=store)
+    first.add_log("searched", "search")
+    old_id = first.event_id(first.seq)
+    store.close()
+
+    store = make_store(tmp_path)
+    second = Stats("alice", event_store=store)
+    assert second.seq == first.seq
+    assert second.parse_event_id(old_id) is None
+    assert second.changes_since(second.parse_event_id(old_id)) is None
+    store.close()
+
+
+def test_event_id_round_trip_gives_delta():
+    stats = Stats("alice")
+    stats.add_log("searched", "search")
+    cursor = stats.parse_event_id(stats.event_id(stats.seq))
+    assert cursor == 1
+    stats.add_log("played", "play")
+    changes = stats.changes_since(cursor)
+    assert [entry["type"] for entry in changes["logs"]] == ["play"]
+    assert changes["deltas"]["plays"] == 1
+    assert stats.parse_event_id("12") is None
+    assert stats.parse_event_id(None) is None
+
+
+def test_minute_series_and_slot_reuse(monkeypatch):
+    now = [60 * 1000 + 5.0]
+    monkeypatch.setattr("stats.time.time", lambda: now[0])
+    stats = Stats("alice", window_minutes=5)
+    stats.add_log("searched", "search")
+    stats.add_log("searched", "search")
+    now[0] += 60
+    stats.add_log("played", "play")
+
+    series = stats.get_series(minutes=3)
+    assert series["searches"] == [0, 2, 0]
+    assert series["plays"] == [0, 0, 1]
+
+    # Five minutes later the first minute's slot is reused and starts from zero
+    now[0] += 4 * 60
+    stats.add_log("searched", "search")
+    series = stats.get_series(minutes=5)
+    assert series["searches"] == [0, 0, 0, 0, 1]
+    assert series["plays"] == [1, 0, 0, 0, 0]
+    assert stats.searches == 3
+
+
+def test_log_ring_keeps_the_newest_entries():
+    stats = Stats("alice", max_logs=3)
+    for i in range(5):
+        stats.add_log(f"event {i}", "system")
+    assert [entry["message"] for entry in stats.logs] == ["event 4", "event 3", "event 2"]
+    assert stats.changes_since(0) is None  # older than the ring, needs a snapshot
+    assert [entry["seq"] for entry in stats.changes_since(3)["logs"]] == [5, 4]
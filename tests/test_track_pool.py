@@ -0,0 +1,48 @@
+import random
+
+from anonymizer import Anonymizer
+from track_pool import TrackPool
+
+
+class SearchClient:
+    def __init__(self, tracks_per_search=5):
+        self.tracks_per_search = tracks_per_search
+        self.searches = 0
+
+    def search(self, query):
+        self.searches += 1
+        base = self.searches * 100
+        items = [{"uri": f"spotify:track:{base + i}", "duration_ms": 1000} for i in range(self.tracks_per_search)]
+        items.append({"uri": "spotify:track:local", "duration_ms": 1000, "is_local": True})
+        return {"tracks": {"items": items}}
+
+
+def make_pool(client=None, **kwargs):
+    anonymizer = Anonymizer(rng=random.Random(1), search_words=["rock", "jazz"])
+    return TrackPool(client or SearchClient(), anonymizer, **kwargs)
+
+
+def test_refill_fills_to_high_water_with_playable_unique_tracks():
+    pool = make_pool(high_water=10, tracks_per_search=3)
+    pool._refill()
+    assert len(pool) >= 10
+    uris = [track["uri"] for track, _ in pool._tracks]
+    assert len(uris) == len(set(uris))
+    assert "spotify:track:local" not in uris
+
+
+def test_refill_gives_up_on_empty_results():
+    client = SearchClient(tracks_per_search=0)
+    pool = make_pool(client, high_water=10, tracks_per_search=3)
+    pool._refill()
+    assert len(pool) == 0
+    assert client.searches == 2 * 10 // 3 + 1
+
+
+def test_expired_tracks_are_dropped():
+    pool = make_pool(high_water=3, max_age=0, low_water=0)
+    pool._refill()
+    for index, (track, _) in enumerate(pool._tracks):
+        pool._tracks[index] = (track, 0)
+    assert pool.take() is None
+
@@ -0,0 +1,52 @@
+import os
+
+from wordlist import MmapWordList, load_word_list
+
+
+def write(path, text, mtime_ns=None):
+    path.write_bytes(text.encode("utf-8"))
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_indexes_non_blank_lines(tmp_path):
+    path = tmp_path / "words.txt"
+    write(path, "rock\n\n  \njazz fusion\nlast")
+    words = MmapWordList(path)
+    assert list(words) == ["rock", "jazz fusion", "last"]
+    assert words[-1] == "last"
+    assert words[0:2] == ["rock", "jazz fusion"]
+    assert os.path.exists(str(path) + ".idx")
+    words.close()
+
+
+def test_saved_index_is_reused_and_invalidated_on_change(tmp_path, monkeypatch):
+    path = tmp_path / "words.txt"
+    write(path, "a\nb\n", mtime_ns=10 ** 18)
+    MmapWordList(path).close()
+
+    def fail(self):
+        raise AssertionError("index should have been loaded from disk")
+
+    monkeypatch.setattr(MmapWordList, "_build_index", fail)
+    assert list(MmapWordList(path)) == ["a", "b"]
+    monkeypatch.undo()
+
+    write(path, "a\nb\nc\n", mtime_ns=2 * 10 ** 18)
+    assert list(MmapWordList(path)) == ["a", "b", "c"]
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "words.txt"
+    write(path, "")
+    assert len(MmapWordList(path)) == 0
+
+
+def test_load_word_list_shares_instances_until_the_file_changes(tmp_path):
+    path = tmp_path / "words.txt"
+    write(path, "a\n", mtime_ns=10 ** 18)
+    first = load_word_list(path)
+    assert load_word_list(str(path)) is first
+    write(path, "a\nb\n", mtime_ns=2 * 10 ** 18)
+    second = load_word_list(path)
+    assert second is not first and len(second) == 2
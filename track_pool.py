@@ -0,0 +1,71 @@
+import random
+import threading
+import time
+import logging
+from collections import deque
+
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class TrackPool:
+    def __init__(self, spotify_client, anonymizer, low_water=5, high_water=20,
+                 max_age=1800, tracks_per_search=3, executor=None):
+        self.spotify_client = spotify_client
+        self.anonymizer = anonymizer
+        self.low_water = low_water
+        self.high_water = high_water
+        self.max_age = max_age
+        self.tracks_per_search = tracks_per_search
+        self.executor = executor
+        self._tracks = deque()  # (track, fetched_at)
+        self._uris = set()
+        self._lock = threading.Lock()
+        self._refill_task = SingleFlight(self._refill, "track pool refill")
+
+    def __len__(self):
+        return len(self._tracks)
+
+    def _drop_expired(self, now):
+        while self._tracks and now - self._tracks[0][1] > self.max_age:
+            track, _ = self._tracks.popleft()
+            self._uris.discard(track.get('uri'))
+
+    def take(self):
+        with self._lock:
+            self._drop_expired(time.time())
+            track = None
+            if self._tracks:
+                track, _ = self._tracks.popleft()
+                self._uris.discard(track.get('uri'))
+            remaining = len(self._tracks)
+        if remaining < self.low_water:
+            self.request_refill()
+        return track
+
+    def request_refill(self):
+        self._refill_task.request(self.executor)
+
+    def _refill(self):
+        # Bound the searches per refill so an empty-result streak can't spin forever
+        attempts = 0
+        max_attempts = 2 * self.high_water // max(1, self.tracks_per_search) + 1
+        while len(self._tracks) < self.high_water and attempts < max_attempts:
+            attempts += 1
+            query = self.anonymizer.get_random_search()
+            if not query:
+                break
+            result = self.spotify_client.search(query)
+            tracks = self.anonymizer.playable_tracks(result)
+            if not tracks:
+                continue
+            picked = random.sample(tracks, min(self.tracks_per_search, len(tracks)))
+            now = time.time()
+            with self._lock:
+                for track in picked:
+                    uri = track.get('uri')
+                    if uri not in self._uris:
+                        self._uris.add(uri)
+                        self._tracks.append((track, now))
+        logger.debug("Track pool refilled to %d tracks after %d searches", len(self._tracks), attempts)
@@ -0,0 +1,102 @@
+import os
+import mmap
+import struct
+import threading
+import logging
+from array import array
+from collections.abc import Sequence
+
+logger = logging.getLogger(__name__)
+
+INDEX_MAGIC = b"WLIX"
+INDEX_HEADER = struct.Struct("<4s1sxxxQQ")  # magic, array typecode, file size, mtime_ns
+
+
+class MmapWordList(Sequence):
+    def __init__(self, path, index_path=None):
+        self.path = str(path)
+        self.index_path = index_path or self.path + ".idx"
+        self._file = open(self.path, "rb")
+        stat = os.fstat(self._file.fileno())
+        self._size = stat.st_size
+        self._mtime_ns = stat.st_mtime_ns
+        self._mm = None
+        if self._size:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._offsets = self._load_index()
+        if self._offsets is None:
+            self._offsets = self._build_index()
+            self._save_index()
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        start = self._offsets[i]
+        end = self._mm.find(b"\n", start)
+        if end == -1:
+            end = self._size
+        return self._mm[start:end].decode("utf-8", "replace").strip()
+
+    def _typecode(self):
+        return "I" if self._size < 2 ** 32 else "Q"
+
+    def _build_index(self):
+        offsets = array(self._typecode())
+        if self._mm is None:
+            return offsets
+        pos = 0
+        self._mm.seek(0)
+        for line in iter(self._mm.readline, b""):
+            if line.strip():
+                offsets.append(pos)
+            pos += len(line)
+        logger.info("Indexed %d terms in %s", len(offsets), self.path)
+        return offsets
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "rb") as f:
+                magic, typecode, size, mtime_ns = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+                if (magic != INDEX_MAGIC or size != self._size or mtime_ns != self._mtime_ns
+                        or typecode.decode() != self._typecode()):
+                    return None
+                offsets = array(typecode.decode())
+                offsets.frombytes(f.read())
+                return offsets
+        except (OSError, struct.error, ValueError):
+            return None
+
+    def _save_index(self):
+        tmp_path = self.index_path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(INDEX_HEADER.pack(INDEX_MAGIC, self._typecode().encode(),
+                                          self._size, self._mtime_ns))
+                f.write(self._offsets.tobytes())
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.warning(f"Could not write wordlist index {self.index_path}: {e}")
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def load_word_list(path):
+    # Accounts in one process share the same mapping and offset index
+    path = os.path.abspath(str(path))
+    mtime_ns = os.stat(path).st_mtime_ns
+    with _cache_lock:
+        words = _cache.get(path)
+        if words is None or words._mtime_ns != mtime_ns:
+            words = MmapWordList(path)
+            _cache[path] = words
+        return words